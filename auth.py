@@ -1,43 +1,124 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import bcrypt
 import streamlit as st
 import sqlite3
-from db import get_db_connection
+from db import SHARDED, get_db_connection, get_user_db_connection
+from cache import user_data_cache, user_cache_key, get_user_version, bump_user_version
+from instrumentation import timed
 
-def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+# bcrypt work factor for new hashes; stored hashes with a lower cost are upgraded on login.
+BCRYPT_ROUNDS = int(os.getenv("MYRITU_BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so a thread pool sized to the cores spreads a burst of logins
+# across CPUs while keeping it from oversubscribing them.
+PASSWORD_HASH_WORKERS = int(os.getenv("MYRITU_PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+_password_executor = None
+_password_executor_lock = threading.Lock()
+
+def _get_password_executor():
+    global _password_executor
+    if _password_executor is None:
+        with _password_executor_lock:
+            if _password_executor is None:
+                _password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="myritu-bcrypt")
+    return _password_executor
+
+def _as_bytes(hashed):
+    return hashed.encode('utf-8') if isinstance(hashed, str) else hashed
+
+def hash_password(password, rounds=None):
+    salt = bcrypt.gensalt(rounds=rounds or BCRYPT_ROUNDS)
+    return _get_password_executor().submit(bcrypt.hashpw, password.encode('utf-8'), salt).result()
 
 def check_password(password, hashed):
-    return bcrypt.checkpw(password.encode('utf-8'), hashed)
+    return _get_password_executor().submit(bcrypt.checkpw, password.encode('utf-8'), _as_bytes(hashed)).result()
 
+def hash_rounds(hashed):
+    # "$2b$12$<salt+hash>" -> 12
+    try:
+        return int(_as_bytes(hashed).split(b'$')[2])
+    except (IndexError, ValueError):
+        return None
+
+def needs_rehash(hashed):
+    rounds = hash_rounds(hashed)
+    return rounds is not None and rounds < BCRYPT_ROUNDS
+
+def _upgrade_password_hash(user_id, password, old_hash):
+    new_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
+    conn = get_db_connection()
+    try:
+        # Only replace the hash we verified against, in case the password changed meanwhile.
+        conn.execute("UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?",
+                     (new_hash, user_id, old_hash))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error upgrading password hash for user {user_id}: {e}")
+    finally:
+        conn.close()
+
+@timed
 def signup_user(username, password, email):
+    hashed_pw = hash_password(password) # hash before taking a pooled connection
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        hashed_pw = hash_password(password)
         cursor.execute(
             "INSERT INTO users (username, password_hash, email) VALUES (?, ?, ?)",
             (username, hashed_pw, email)
         )
         user_id = cursor.lastrowid
-        # Create an empty profile with user_id
-        cursor.execute(
-            "INSERT INTO user_profiles (user_id) VALUES (?)", (user_id,)
-        )
+        if not SHARDED:
+            # Create an empty profile with user_id
+            cursor.execute(
+                "INSERT INTO user_profiles (user_id) VALUES (?)", (user_id,)
+            )
         conn.commit()
-        return True, "Signup successful!"
     except sqlite3.IntegrityError:
         return False, "Username or email already exists."
     finally:
         conn.close()
+    if SHARDED:
+        # The users row is committed first, so the main database's write lock isn't held
+        # while the new shard file is created; the row is removed again if that fails.
+        return _create_shard_profile(user_id)
+    return True, "Signup successful!"
 
+def _create_shard_profile(user_id):
+    try:
+        conn = get_user_db_connection(user_id, create=True)  # the only place a shard file is created
+        try:
+            conn.execute("INSERT OR IGNORE INTO user_profiles (user_id) VALUES (?)", (user_id,))
+            conn.commit()
+        finally:
+            conn.close()
+        return True, "Signup successful!"
+    except sqlite3.Error as e:
+        print(f"Error creating profile for user {user_id}: {e}")
+        conn = get_db_connection()
+        try:
+            conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            conn.commit()
+        finally:
+            conn.close()
+        return False, f"Database error: {e}"
+
+@timed
 def login_user(username, password):
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, password_hash FROM users WHERE username = ?", (username,))
-    user = cursor.fetchone()
-    conn.close()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, password_hash FROM users WHERE username = ?", (username,))
+        user = cursor.fetchone()
+    finally:
+        conn.close()
 
     if user and check_password(password, user['password_hash']):
+        if needs_rehash(user['password_hash']):
+            # Transparent upgrade to the current work factor, off the login path.
+            _get_password_executor().submit(_upgrade_password_hash, user['id'], password, user['password_hash'])
         st.session_state.logged_in = True
         st.session_state.user_id = user['id']
         st.session_state.username = username
@@ -50,24 +131,32 @@ def logout_user():
         'logged_in', 'user_id', 'username', 'profile_info', 
         'Ritu_chat_messages', 'show_signup', 'show_profile_modal', 
         'navigate_to_profile', 'initial_profile_setup', 'initial_profile_done',
-        'current_tab'
+        'current_tab', 'chat_loaded_from_db', 'chat_has_older', 'pending_chat_job_id',
+        'chat_session_key', 'chat_turn', 'chat_request_key', 'chat_error',
+        'calendar_month'
     ]
     for key in keys_to_clear:
         if key in st.session_state:
             del st.session_state[key]
     st.rerun() # Rerun to go back to login state
 
+@timed
 def get_user_profile(user_id):
-    conn = get_db_connection()
-    profile = conn.execute("SELECT * FROM user_profiles WHERE user_id = ?", (user_id,)).fetchone()
-    conn.close()
-    if profile:
-        return dict(profile)
-    return {}
+    cache_key = user_cache_key("profile", user_id)
+    cached = user_data_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+    conn = get_user_db_connection(user_id)
+    try:
+        profile = conn.execute("SELECT * FROM user_profiles WHERE user_id = ?", (user_id,)).fetchone()
+    finally:
+        conn.close()
+    profile = dict(profile) if profile else {}
+    user_data_cache.put(cache_key, profile)
+    return dict(profile)
 
+@timed
 def update_user_profile(user_id, profile_data):
-    conn = get_db_connection()
-    cursor = conn.cursor()
     set_clauses = []
     values = []
     # Ensure all columns from your user_profiles table are potentially updatable here
@@ -86,9 +175,19 @@ def update_user_profile(user_id, profile_data):
     values.append(user_id) # For the WHERE clause
     query = f"UPDATE user_profiles SET {', '.join(set_clauses)} WHERE user_id = ?"
     
+    previous_version = get_user_version(user_id)
+    previous_profile = user_data_cache.peek(("profile", user_id, previous_version))
+    conn = get_user_db_connection(user_id)
+    cursor = conn.cursor()
     try:
         cursor.execute(query, tuple(values))
         conn.commit()
+        version = bump_user_version(user_id)
+        if previous_profile and version == previous_version + 1:
+            # Write-through: the cached row plus the columns just written is the new row.
+            updated_profile = dict(previous_profile)
+            updated_profile.update({key: value for key, value in profile_data.items() if key in valid_profile_columns})
+            user_data_cache.put(("profile", user_id, version), updated_profile)
         # Refresh profile_info in session state after update
         st.session_state.profile_info = get_user_profile(user_id)
         return True, "Profile updated successfully."
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Write-behind queue drained by one background thread. Items are handed to write_batch in
+# groups: a batch goes out as soon as it reaches max_batch items or its oldest item has
+# waited max_latency seconds, so many small writes share one transaction (and one fsync)
+# instead of paying for their own on the caller's thread.
+#
+# submit() returns a Future that resolves to write_batch's result for the item (e.g. the
+# new row id) once its batch has committed, or to False if it could not be written. Every
+# item also carries a key (e.g. a user id); flush(key) blocks until everything submitted
+# for that key so far is written, which is how readers see their own writes.
+
+WRITE_ATTEMPTS = 3
+RETRY_DELAY_SECONDS = 0.1
+
+
+class BatchWriter:
+    def __init__(self, write_batch, max_batch=256, max_latency=0.05, max_queued=10000, name="batch"):
+        # write_batch(items) writes a list of items and returns one result per item, None
+        # for each item that was not written; only those are retried (False: not written
+        # and not to be retried, e.g. its user is gone). It must not raise
+        # once anything is committed, since nothing would be known about what was.
+        self._write_batch = write_batch
+        self.max_batch = max(1, max_batch)
+        self.max_latency = max(0.0, max_latency)
+        self.max_queued = max(self.max_batch, max_queued)
+        self.name = name
+        self._cond = threading.Condition(threading.Lock())
+        self._queue = deque()  # (seq, key, item, submitted_at, future)
+        self._last_seq = 0  # seq of the newest submitted item
+        self._done_seq = 0  # every item up to this seq has been written (or given up on)
+        self._last_seq_by_key = {}
+        self._flush_requested = False
+        self._closed = False
+        self._thread = None
+        self._stats = {"submitted": 0, "written": 0, "dropped": 0, "batches": 0, "largest_batch": 0,
+                       "submit_waits": 0}
+
+    def submit(self, key, item):
+        # Queues item and returns its Future; None once the writer is closed (the caller
+        # writes it itself).
+        future = Future()
+        with self._cond:
+            if self._closed:
+                return None
+            while len(self._queue) >= self.max_queued and not self._closed:
+                # Back-pressure rather than unbounded memory when the database falls behind.
+                self._stats["submit_waits"] += 1
+                self._cond.wait()
+            if self._closed:
+                return None
+            self._last_seq += 1
+            self._queue.append((self._last_seq, key, item, time.monotonic(), future))
+            self._last_seq_by_key[key] = self._last_seq
+            self._stats["submitted"] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"myritu-{self.name}-writer", daemon=True)
+                self._thread.start()
+            if len(self._queue) == 1 or len(self._queue) >= self.max_batch:
+                self._cond.notify_all()
+        return future
+
+    def flush(self, key=None, timeout=None):
+        # Waits until everything submitted so far (for key, or for all keys) is written.
+        # Returns False if that did not happen within timeout seconds.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._last_seq if key is None else self._last_seq_by_key.get(key, 0)
+            if self._done_seq >= target:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._done_seq < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=10.0):
+        # Writes whatever is queued, then stops the thread; later submits are refused.
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queued"] = len(self._queue)
+        return stats
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            deadline = self._queue[0][3] + self.max_latency
+            while len(self._queue) < self.max_batch and not self._flush_requested and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            if not self._queue:
+                self._flush_requested = False
+            self._cond.notify_all()  # room for blocked submitters
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            results = [None] * len(batch)
+            pending = list(range(len(batch)))  # indexes not written yet
+            for attempt in range(1, WRITE_ATTEMPTS + 1):
+                try:
+                    written = self._write_batch([batch[index][2] for index in pending])
+                except Exception as e:
+                    # Unknown how much was committed; retrying could write items twice.
+                    print(f"Error writing {self.name} batch: {e}")
+                    break
+                still_pending = []
+                for index, result in zip(pending, written):
+                    if result is None:
+                        still_pending.append(index)
+                    else:
+                        results[index] = result
+                pending = still_pending
+                if not pending:
+                    break
+                if attempt < WRITE_ATTEMPTS:
+                    time.sleep(RETRY_DELAY_SECONDS * attempt)
+            if pending:
+                print(f"Dropped {len(pending)} {self.name} writes")
+            dropped = 0
+            for entry, result in zip(batch, results):
+                if result is None or result is False:
+                    dropped += 1
+                entry[4].set_result(False if result is None else result)
+            with self._cond:
+                self._stats["dropped"] += dropped
+                self._stats["written"] += len(batch) - dropped
+                self._stats["batches"] += 1
+                self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+                self._done_seq = batch[-1][0]
+                for entry in batch:
+                    key = entry[1]
+                    if self._last_seq_by_key.get(key, 0) <= self._done_seq:
+                        self._last_seq_by_key.pop(key, None)
+                self._cond.notify_all()
@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+# Measures password verification throughput at several bcrypt work factors, single-threaded
+# (logins/s per core) and across a worker pool (logins/s per instance), to size instances
+# and pick MYRITU_BCRYPT_ROUNDS.
+#
+#   python -m benchmarks.bench_bcrypt --costs 10 11 12 13 --workers 4 --json bcrypt.json
+
+
+def _verify_batch(password, hashed, count):
+    for _ in range(count):
+        bcrypt.checkpw(password, hashed)
+
+
+def bench_cost(cost, workers, min_seconds):
+    password = b"correct horse battery staple"
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds=cost))
+
+    # Calibrate: how many verifications fit in roughly min_seconds on one core.
+    started = time.perf_counter()
+    bcrypt.checkpw(password, hashed)
+    single = time.perf_counter() - started
+    iterations = max(3, int(min_seconds / max(single, 1e-6)))
+
+    started = time.perf_counter()
+    _verify_batch(password, hashed, iterations)
+    single_elapsed = time.perf_counter() - started
+    per_core = iterations / single_elapsed
+
+    per_worker = max(1, iterations // workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        started = time.perf_counter()
+        list(pool.map(lambda _: _verify_batch(password, hashed, per_worker), range(workers)))
+        pool_elapsed = time.perf_counter() - started
+    pooled = per_worker * workers / pool_elapsed
+
+    return {
+        "cost": cost,
+        "verify_ms": 1000 * single_elapsed / iterations,
+        "logins_per_second_per_core": per_core,
+        "workers": workers,
+        "logins_per_second_pooled": pooled,
+        "pool_scaling": pooled / per_core,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="bcrypt login throughput benchmark")
+    parser.add_argument("--costs", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seconds", type=float, default=1.0, help="approximate time per measurement")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    results = [bench_cost(cost, args.workers, args.seconds) for cost in args.costs]
+    print(f"{'cost':>4} {'verify ms':>10} {'logins/s/core':>14} {'logins/s (' + str(args.workers) + ' workers)':>22} {'scaling':>8}")
+    for r in results:
+        print(f"{r['cost']:>4} {r['verify_ms']:>10.1f} {r['logins_per_second_per_core']:>14.1f} "
+              f"{r['logins_per_second_pooled']:>22.1f} {r['pool_scaling']:>7.2f}x")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "bcrypt", "cpu_count": os.cpu_count(), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import argparse
+import importlib.util
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from chat_backends import LOCAL_MODEL_PATH, LocalChatBackend, RemoteChatBackend
+from benchmarks.stub_inference_server import start_stub_server
+
+# Chat reply latency and throughput of the chat backends at several concurrency levels:
+# the remote backend (served by benchmarks/stub_inference_server.py, so its numbers are
+# the client overhead plus the stub's simulated generation speed) and, when a GGUF model
+# is given and llama-cpp-python is installed, the local CPU backend. Replies are streamed,
+# as in the app, so time to first token is reported too.
+#
+#   python -m benchmarks.bench_chat_backends --model tinyllama-1.1b-chat.Q4_K_M.gguf \
+#       --concurrency 1 2 4 --local-max-concurrent 2 --json backends.json
+
+PROMPT = """<|system|>
+You are MyRitu Chat, a warm and careful assistant for menstrual health questions.
+
+User's Context:
+User Profile for MyRitu App:
+- Age: 29 years old.
+- Average Ritu Length from profile: 28 days
+- Average Period Length: 5 days
+- Last Period Started: 2024-03-02</s>
+<|user|>
+My question is: "Why do I get cramps before my period?"</s>
+<|assistant|>
+"""
+
+
+def _payload(max_new_tokens):
+    return {"inputs": PROMPT, "parameters": {"max_new_tokens": max_new_tokens, "return_full_text": False,
+                                             "temperature": 0.7, "top_p": 0.9, "do_sample": True,
+                                             "repetition_penalty": 1.1}}
+
+
+def _one_reply(backend, payload):
+    stream_stats = {}
+    started = time.perf_counter()
+    for _ in backend.stream(payload, stream_stats):
+        pass
+    return time.perf_counter() - started, stream_stats
+
+
+def bench_backend(backend, payload, requests, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        replies = list(pool.map(lambda _: _one_reply(backend, payload), range(requests)))
+        elapsed = time.perf_counter() - started
+    latencies = sorted(latency for latency, _ in replies)
+    first_tokens = sorted(stats["time_to_first_token"] for _, stats in replies if stats.get("time_to_first_token") is not None)
+    tokens = sum(stats.get("tokens", 0) for _, stats in replies)
+    return {
+        "backend": backend.name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "latency_p50_s": statistics.median(latencies),
+        "latency_p95_s": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+        "first_token_p50_s": statistics.median(first_tokens) if first_tokens else None,
+        "replies_per_second": requests / elapsed,
+        "tokens_per_second": tokens / elapsed,
+        "tokens_per_reply": tokens / requests,
+    }
+
+
+def _print_result(result):
+    first_token = "-" if result["first_token_p50_s"] is None else f"{result['first_token_p50_s']:.3f}"
+    print(f"  {result['backend']:<7} x{result['concurrency']:<3} p50 {result['latency_p50_s']:7.2f} s  "
+          f"p95 {result['latency_p95_s']:7.2f} s  first token {first_token} s  "
+          f"{result['replies_per_second']:6.2f} replies/s  {result['tokens_per_second']:7.1f} tokens/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MyRitu chat backend latency and throughput")
+    parser.add_argument("--requests", type=int, default=8, help="replies per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--max-new-tokens", type=int, default=128)
+    parser.add_argument("--model", default=LOCAL_MODEL_PATH, help="GGUF model for the local backend")
+    parser.add_argument("--local-max-concurrent", type=int, default=1, help="local generation slots")
+    parser.add_argument("--local-threads", type=int, default=0, help="threads per local generation (0: split the cores)")
+    parser.add_argument("--stub-first-token-delay", type=float, default=0.2)
+    parser.add_argument("--stub-token-delay", type=float, default=0.02)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+    payload = _payload(args.max_new_tokens)
+    results = []
+    report = {"benchmark": "chat_backends", "max_new_tokens": args.max_new_tokens, "results": results}
+
+    stub = start_stub_server(first_token_delay=args.stub_first_token_delay, token_delay=args.stub_token_delay)
+    try:
+        remote = RemoteChatBackend("benchmark", api_url=stub.url)
+        _one_reply(remote, payload)  # opens the pooled connection
+        for concurrency in args.concurrency:
+            results.append(bench_backend(remote, payload, args.requests, concurrency))
+            _print_result(results[-1])
+    finally:
+        stub.shutdown()
+
+    if not args.model:
+        report["local_skipped"] = "no model (--model or MYRITU_LOCAL_MODEL_PATH)"
+    elif importlib.util.find_spec("llama_cpp") is None:
+        report["local_skipped"] = "llama-cpp-python is not installed"
+    else:
+        local = LocalChatBackend(args.model, max_concurrent=args.local_max_concurrent, n_threads=args.local_threads)
+        started = time.perf_counter()
+        local.preload()
+        report["local_model_load_s"] = time.perf_counter() - started
+        report["local_threads"] = local.n_threads
+        report["local_max_concurrent"] = local.max_concurrent
+        print(f"  local model loaded in {report['local_model_load_s']:.2f} s "
+              f"({local.n_threads} threads x {local.max_concurrent} slots)")
+        # One reply per slot at once, so every slot's model is loaded before timing starts.
+        bench_backend(local, payload, local.max_concurrent, local.max_concurrent)
+        for concurrency in args.concurrency:
+            results.append(bench_backend(local, payload, args.requests, concurrency))
+            _print_result(results[-1])
+    if report.get("local_skipped"):
+        print(f"  local backend skipped: {report['local_skipped']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
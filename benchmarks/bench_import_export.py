@@ -0,0 +1,115 @@
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Bulk import / streaming export throughput on a throwaway database: generates a history
+# of --rows entries, imports it in each format into a fresh user, then exports it back.
+#
+#   python -m benchmarks.bench_import_export --rows 100000 --json import_export.json
+
+MOODS = ["Happy", "Sad", "Irritable", "Anxious", "Calm", "Energetic", "Tired"]
+FLOWS = ["Light", "Medium", "Heavy", "Spotting"]
+
+
+def synthetic_records(rows, seed=7):
+    rng = random.Random(seed)
+    start = date(1, 1, 1)  # 100k cycles span ~8,000 years; start early enough to stay below 9999
+    for _ in range(rows):
+        length = rng.randint(4, 7)
+        yield {
+            "period_start_date": start.isoformat(),
+            "period_end_date": (start + timedelta(days=length)).isoformat(),
+            "symptoms": {"mood": rng.choice(MOODS), "flow": rng.choice(FLOWS),
+                         "pain_cramps": rng.randint(0, 10), "fatigue": rng.random() < 0.4},
+            "notes": "imported" if rng.random() < 0.1 else None,
+        }
+        start += timedelta(days=rng.randint(24, 35))
+
+
+def write_source(path, fmt, rows):
+    with open(path, "w", newline="") as f:
+        if fmt == "csv":
+            f.write("period_start_date,period_end_date,mood,flow,pain_cramps,fatigue,notes\n")
+            for r in synthetic_records(rows):
+                s = r["symptoms"]
+                f.write(f"{r['period_start_date']},{r['period_end_date']},{s['mood']},{s['flow']},"
+                        f"{s['pain_cramps']},{str(s['fatigue']).lower()},{r['notes'] or ''}\n")
+        elif fmt == "json":
+            f.write("[")
+            for index, r in enumerate(synthetic_records(rows)):
+                f.write(("," if index else "") + "\n" + json.dumps(r))
+            f.write("\n]\n")
+        else:
+            for r in synthetic_records(rows):
+                f.write(json.dumps(r) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ritu history import/export throughput benchmark")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--formats", nargs="+", default=["csv", "json", "ndjson"])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="myritu-bench-")
+    os.environ["MYRITU_DB_PATH"] = os.path.join(workdir, "bench.db")
+    # Imported after MYRITU_DB_PATH is set so the app modules open the throwaway database.
+    from db import get_db_connection
+    from ritu_io import export_Ritu_history, import_Ritu_history
+
+    results = []
+    for user_id, fmt in enumerate(args.formats, start=1):
+        conn = get_db_connection()
+        conn.execute("INSERT INTO users (id, username, password_hash, email) VALUES (?, ?, ?, ?)",
+                     (user_id, f"bench{user_id}", "x", f"bench{user_id}@example.com"))
+        conn.execute("INSERT INTO user_profiles (user_id) VALUES (?)", (user_id,))
+        conn.commit()
+        conn.close()
+
+        source = os.path.join(workdir, f"history.{fmt}")
+        write_source(source, fmt, args.rows)
+        with open(source, newline="") as f:
+            started = time.perf_counter()
+            success, message, summary = import_Ritu_history(user_id, f, fmt, chunk_size=args.chunk_size)
+            import_seconds = time.perf_counter() - started
+        if not success:
+            print(f"{fmt}: import failed: {message}")
+            return 1
+
+        out = io.StringIO()
+        started = time.perf_counter()
+        exported = export_Ritu_history(user_id, out, fmt)
+        export_seconds = time.perf_counter() - started
+
+        results.append({
+            "format": fmt,
+            "rows": args.rows,
+            "imported": summary["imported"],
+            "import_seconds": import_seconds,
+            "import_rows_per_second": summary["imported"] / import_seconds,
+            "exported": exported,
+            "export_seconds": export_seconds,
+            "export_rows_per_second": exported / export_seconds if export_seconds else 0.0,
+            "export_bytes": len(out.getvalue()),
+            "source_bytes": os.path.getsize(source),
+        })
+
+    print(f"{'format':>7} {'rows':>8} {'import s':>9} {'import rows/s':>14} {'export s':>9} {'export rows/s':>14}")
+    for r in results:
+        print(f"{r['format']:>7} {r['imported']:>8} {r['import_seconds']:>9.2f} {r['import_rows_per_second']:>14.0f} "
+              f"{r['export_seconds']:>9.2f} {r['export_rows_per_second']:>14.0f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "import_export", "chunk_size": args.chunk_size, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
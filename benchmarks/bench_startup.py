@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Cold-start cost of the app: how long a fresh process takes to import Streamlit, to run
+# main.py for the first time (the login page: app imports plus the first render), to rerun
+# it, and to import each tab module on first use. Also lists the heavy dependencies the
+# login page imported on top of Streamlit's own. Every run is a new interpreter, so
+# nothing is warm.
+#
+#   python -m benchmarks.bench_startup --runs 5 --json startup.json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "numpy", "plotly", "streamlit_calendar", "streamlit_option_menu", "requests", "dotenv", "PIL"]
+TAB_MODULES = ["tabs.tab_home", "tabs.tab_calendar", "tabs.tab_hormones", "tabs.tab_insights", "tabs.tab_chat"]
+
+
+def _child():
+    # Runs in the fresh interpreter; prints one JSON line of timings (ms).
+    import importlib
+    timings = {}
+    started = time.perf_counter()
+    import streamlit
+    from streamlit.testing.v1 import AppTest
+    timings["streamlit_import_ms"] = 1000 * (time.perf_counter() - started)
+    preloaded = set(sys.modules)  # Streamlit itself already brings in some (plotly, PIL)
+    import streamlit.logger
+    streamlit.logger.set_log_level("error")
+
+    app = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=120)
+    started = time.perf_counter()
+    app.run()
+    timings["login_first_render_ms"] = 1000 * (time.perf_counter() - started)
+    if app.exception:
+        raise SystemExit(f"login page raised: {app.exception[0].message}")
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules and name not in preloaded]
+
+    started = time.perf_counter()
+    app.run()
+    timings["login_rerun_ms"] = 1000 * (time.perf_counter() - started)
+
+    for module_name in TAB_MODULES:
+        started = time.perf_counter()
+        importlib.import_module(module_name)
+        timings[f"first_import {module_name} ms"] = 1000 * (time.perf_counter() - started)
+    print(json.dumps({"timings": timings, "login_heavy_modules": loaded}))
+
+
+def run_once(db_path):
+    env = dict(os.environ, MYRITU_DB_PATH=db_path)
+    result = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child"], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"startup run failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MyRitu import time and time to first render of the login page")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        _child()
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix="myritu-startup-")
+    db_path = os.path.join(workdir, "startup.db")
+    run_once(db_path)  # creates and migrates the database, so the timed runs measure startup only
+    runs = [run_once(db_path) for _ in range(args.runs)]
+
+    results = {}
+    for name in runs[0]["timings"]:
+        samples = sorted(run["timings"][name] for run in runs)
+        results[name] = {"median_ms": statistics.median(samples), "min_ms": samples[0], "max_ms": samples[-1]}
+        print(f"  {name:<40} median {results[name]['median_ms']:9.1f} ms  "
+              f"min {samples[0]:9.1f} ms  max {samples[-1]:9.1f} ms")
+    heavy = runs[0]["login_heavy_modules"]
+    print(f"  heavy modules imported for the login page: {', '.join(heavy) or 'none'}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "startup", "runs": args.runs, "results": results,
+                       "login_heavy_modules": heavy}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
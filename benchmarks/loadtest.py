@@ -0,0 +1,326 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+
+# Headless load test: many concurrent simulated sessions replay realistic flows (signup
+# or login, then Home, Calendar, Insights, logging a period and chatting) directly against
+# auth, db and the tabs' data-preparation code, with chat answered by the local stub
+# inference server. Reports per-operation p50/p95/p99 latency, throughput and how often
+# SQLite reported "database is locked".
+#
+#   python -m benchmarks.loadtest --processes 4 --threads 8 --duration 60 --json load.json
+#
+# Concurrency is processes x threads; with --processes 1 everything runs in one process
+# (GIL-bound Python work contends, as it does inside one Streamlit server).
+
+OPERATION_WEIGHTS = {"home": 4, "calendar": 3, "insights": 2, "log_period": 1, "chat": 1}
+LOCKED_MESSAGE = "database is locked"
+
+
+class _LockedCounter:
+    # stdout wrapper that counts "database is locked" reports from the app's own error
+    # handling (it prints and returns a failure rather than raising).
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        if LOCKED_MESSAGE in text:
+            with self.lock:
+                self.count += text.count(LOCKED_MESSAGE)
+        return len(text)  # app log lines are swallowed to keep the report readable
+
+    def flush(self):
+        pass
+
+
+def _load_app():
+    # Imported lazily so the environment (database path, stub URL) is set before the app loads.
+    from types import SimpleNamespace
+    import auth, db, precompute, prediction
+    from benchmarks import synthetic
+    from chat_jobs import ChatJob
+    from tabs import tab_calendar, tab_chat
+    from utils import generate_hormone_graph_data
+    return SimpleNamespace(auth=auth, db=db, precompute=precompute, prediction=prediction, synthetic=synthetic,
+                           ChatJob=ChatJob, tab_calendar=tab_calendar, tab_chat=tab_chat,
+                           generate_hormone_graph_data=generate_hormone_graph_data)
+
+
+class SessionRunner:
+    def __init__(self, config, seed):
+        self.app = _load_app()
+        self.config = config
+        self.rng = random.Random(seed)
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def _timed(self, name, fn, *args):
+        started = time.perf_counter()
+        try:
+            result = fn(*args)
+        except sqlite3.OperationalError as e:
+            self.errors["locked" if LOCKED_MESSAGE in str(e) else f"{name}: {e}"] += 1
+            return None
+        except Exception as e:
+            self.errors[f"{name}: {type(e).__name__}: {e}"] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - started)
+        if isinstance(result, tuple) and len(result) >= 2 and result[0] is False:
+            self.errors["locked" if LOCKED_MESSAGE in str(result[1]) else f"{name}: {result[1]}"] += 1
+        return result
+
+    def _user_id(self, username):
+        conn = self.app.db.get_db_connection()
+        try:
+            row = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+        finally:
+            conn.close()
+        return row["id"] if row else None
+
+    def start_session(self):
+        auth = self.app.auth
+        if self.rng.random() < self.config["signup_ratio"]:
+            username = f"load_{uuid.uuid4().hex[:12]}"
+            self._timed("signup", auth.signup_user, username, "load-test-password", f"{username}@example.com")
+            user_id = self._user_id(username)
+            if user_id is not None:
+                self._timed("update_profile", auth.update_user_profile, user_id, {
+                    "full_name": "Load Test", "birth_date": "1995-04-12", "avg_Ritu_length": 28,
+                    "avg_period_length": 5, "last_period_start": (date.today() - timedelta(days=10)).isoformat()})
+            return user_id
+        user_id = self.rng.randint(1, self.config["users"])
+        self._timed("login", auth.login_user, self.app.synthetic.username_for(user_id), self.app.synthetic.SYNTHETIC_PASSWORD)
+        return user_id
+
+    # One method per flow, doing what the tab does before rendering.
+    def home(self, user_id):
+        profile = self.app.auth.get_user_profile(user_id)
+        return self.app.precompute.get_home_prediction(user_id, profile, self.app.db.get_Ritu_stats(user_id))
+
+    def calendar(self, user_id):
+        profile = self.app.auth.get_user_profile(user_id)
+        prediction = self.app.prediction.predict_next_period(
+            self.app.db.get_Ritu_stats(user_id), profile.get("last_period_start"), profile.get("avg_Ritu_length"))
+        window_start, window_end = self.app.tab_calendar._calendar_window(date.today().replace(day=1))
+        return self.app.tab_calendar.build_calendar_events(
+            user_id, window_start, window_end,
+            prediction["last_period_start"].isoformat() if prediction else None,
+            profile.get("avg_period_length") or 5, prediction["Ritu_length_days"] if prediction else None)
+
+    def insights(self, user_id):
+        db = self.app.db
+        profile = self.app.auth.get_user_profile(user_id)
+        df = db.load_Ritu_history_df(user_id, columns=["period_start_date"])
+        db.get_symptom_value_counts(user_id, "mood")
+        db.get_symptom_series(user_id, "pain_cramps")
+        self.app.generate_hormone_graph_data(profile.get("avg_Ritu_length") or 28, points_per_day=4)
+        return df
+
+    def log_period(self, user_id):
+        profile = self.app.auth.get_user_profile(user_id)
+        last = profile.get("last_period_start")
+        start = (date.fromisoformat(last) if last else date.today()) + timedelta(days=self.rng.randint(25, 32))
+        symptoms = {"mood": self.rng.choice(["Happy", "Sad", "Neutral"]), "pain_cramps": self.rng.randint(0, 5)}
+        result = self.app.db.log_period_data(user_id, start.isoformat(), None, symptoms, "")
+        if result[0]:
+            result = self.app.auth.update_user_profile(user_id, {"last_period_start": start.isoformat()})
+        return result
+
+    def chat(self, user_id):
+        question = "What can help with cramps?"
+        self.app.db.log_chat_message(user_id, "user", question)
+        job = self.app.ChatJob(uuid.uuid4().hex, user_id, uuid.uuid4().hex)
+        return self.app.tab_chat.run_chat_job(job, user_id, question, self.app.tab_chat.build_chat_payload(user_id, question))
+
+    def run_session(self):
+        user_id = self.start_session()
+        if user_id is None:
+            return
+        names = list(OPERATION_WEIGHTS)
+        weights = list(OPERATION_WEIGHTS.values())
+        for _ in range(self.config["actions_per_session"]):
+            name = self.rng.choices(names, weights)[0]
+            self._timed(name, getattr(self, name), user_id)
+            if self.config["think_time"]:
+                time.sleep(self.rng.uniform(0, 2 * self.config["think_time"]))
+
+
+def _run_threads(config, worker_index):
+    # Runs config["threads"] session loops in this process until the deadline; returns raw results.
+    runners = []
+    deadline = config["deadline"]
+
+    def loop(runner):
+        while time.time() < deadline:
+            runner.run_session()
+
+    for thread_index in range(config["threads"]):
+        runners.append(SessionRunner(config, seed=config["seed"] * 100003 + worker_index * 1009 + thread_index))
+    import streamlit.logger
+    streamlit.logger.set_log_level("error")  # ScriptRunContext/session_state warnings in bare mode
+    counter = _LockedCounter(sys.stdout)
+    sys.stdout = counter
+    threads = [threading.Thread(target=loop, args=(runner,)) for runner in runners]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sys.stdout = counter.stream
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    for runner in runners:
+        for name, values in runner.latencies.items():
+            latencies[name].extend(values)
+        for name, count in runner.errors.items():
+            errors[name] += count
+    return {"latencies": dict(latencies), "errors": dict(errors), "locked_reports": counter.count}
+
+
+def _process_worker(config, worker_index, queue):
+    queue.put(_run_threads(config, worker_index))
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(raw_results, elapsed):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    locked_reports = 0
+    for raw in raw_results:
+        for name, values in raw["latencies"].items():
+            latencies[name].extend(values)
+        for name, count in raw["errors"].items():
+            errors[name] += count
+        locked_reports += raw["locked_reports"]
+    operations = {}
+    for name, values in sorted(latencies.items()):
+        values.sort()
+        operations[name] = {
+            "count": len(values),
+            "throughput_per_second": len(values) / elapsed,
+            "p50_ms": 1000 * _percentile(values, 0.50),
+            "p95_ms": 1000 * _percentile(values, 0.95),
+            "p99_ms": 1000 * _percentile(values, 0.99),
+            "max_ms": 1000 * values[-1],
+        }
+    total = sum(op["count"] for op in operations.values())
+    return {
+        "elapsed_seconds": elapsed,
+        "operations": operations,
+        "total_operations": total,
+        "throughput_per_second": total / elapsed,
+        # Raised OperationalErrors plus failures the app reported (printed) itself.
+        "database_locked": errors.pop("locked", 0) + locked_reports,
+        "errors": dict(errors),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for MyRitu's db/auth/chat layers")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8, help="concurrent sessions per process")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--users", type=int, default=200, help="synthetic users to log in as")
+    parser.add_argument("--years", type=float, default=3, help="history per synthetic user")
+    parser.add_argument("--signup-ratio", type=float, default=0.1, help="share of sessions that sign up a new user")
+    parser.add_argument("--actions-per-session", type=int, default=8)
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean seconds between actions")
+    parser.add_argument("--bcrypt-rounds", type=int, help="override MYRITU_BCRYPT_ROUNDS for signups")
+    parser.add_argument("--stub-first-token-delay", type=float, default=0.2)
+    parser.add_argument("--stub-token-delay", type=float, default=0.01)
+    parser.add_argument("--db", help="database file (default: a fresh temporary one)")
+    parser.add_argument("--storage", choices=["single", "sharded"], default="single",
+                        help="MYRITU_STORAGE_MODE; sharded seeds the main database and then splits it")
+    parser.add_argument("--shard-buckets", type=int, default=0, help="MYRITU_SHARD_BUCKETS (0 = one file per user)")
+    parser.add_argument("--instrumentation", action="store_true",
+                        help="MYRITU_INSTRUMENTATION=1: measure with span timing and query counting on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    from benchmarks.stub_inference_server import start_stub_server
+    stub = start_stub_server(first_token_delay=args.stub_first_token_delay, token_delay=args.stub_token_delay)
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="myritu-load-"), "load.db")
+    # Process workers are spawned (not forked) and inherit these before importing the app.
+    os.environ["MYRITU_DB_PATH"] = db_path
+    os.environ["MYRITU_CHAT_API_URL"] = stub.url
+    os.environ.setdefault("HF_API_TOKEN", "load-test")
+    os.environ["MYRITU_STORAGE_MODE"] = args.storage
+    os.environ["MYRITU_SHARD_BUCKETS"] = str(args.shard_buckets)
+    os.environ["MYRITU_INSTRUMENTATION"] = "1" if args.instrumentation else "0"
+    if args.bcrypt_rounds:
+        os.environ["MYRITU_BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+    seeding = multiprocessing.get_context("spawn").Process(target=_seed_database, args=(args.users, args.years, args.seed))
+    seeding.start()
+    seeding.join()
+
+    config = {
+        "users": args.users, "signup_ratio": args.signup_ratio, "actions_per_session": args.actions_per_session,
+        "think_time": args.think_time, "threads": args.threads, "seed": args.seed,
+    }
+    print(f"Load test: {args.processes} process(es) x {args.threads} thread(s) for {args.duration:.0f}s on {db_path}"
+          + (f" (sharded, {args.shard_buckets or 'per-user'} buckets)" if args.storage == "sharded" else ""))
+    started = time.time()
+    config["deadline"] = started + args.duration
+    if args.processes == 1:
+        raw_results = [_run_threads(config, 0)]
+    else:
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        workers = [context.Process(target=_process_worker, args=(config, index, queue)) for index in range(args.processes)]
+        for worker in workers:
+            worker.start()
+        raw_results = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+    report = summarize(raw_results, time.time() - started)
+    stub.shutdown()
+
+    print(f"{'operation':<15} {'count':>7} {'ops/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, op in report["operations"].items():
+        print(f"{name:<15} {op['count']:>7} {op['throughput_per_second']:>8.1f} {op['p50_ms']:>9.1f} "
+              f"{op['p95_ms']:>9.1f} {op['p99_ms']:>9.1f} {op['max_ms']:>9.1f}")
+    print(f"Total: {report['total_operations']} operations, {report['throughput_per_second']:.1f} ops/s; "
+          f"'database is locked': {report['database_locked']}; other errors: {sum(report['errors'].values())}")
+    for name, count in report["errors"].items():
+        print(f"  {count} x {name}")
+    if args.json:
+        report.update(processes=args.processes, threads=args.threads, users=args.users, db=db_path,
+                      storage=args.storage, shard_buckets=args.shard_buckets, instrumentation=args.instrumentation)
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+def _seed_database(users, years, seed):
+    from benchmarks.synthetic import generate
+    from db import SHARDED, get_db_connection
+    conn = get_db_connection()
+    try:
+        if conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] != 0:
+            return
+        generate(conn, users, years=years, chat_messages=50, seed=seed)
+    finally:
+        conn.close()
+    if SHARDED:
+        from split_shards import split_database
+        split_database(prune=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
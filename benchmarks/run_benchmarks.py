@@ -0,0 +1,190 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+# Times the MyRitu hot paths on synthetic data at several history sizes and writes the
+# results as JSON, so two runs (e.g. before and after a change) can be compared:
+#
+#   python -m benchmarks.run_benchmarks --json after.json --compare before.json
+#
+# Each size is one synthetic user with YEARS of periods and CHAT chat messages
+# (--sizes 1:100 5:1000 20:10000), alongside --background-users ordinary users. Chat
+# replies come from benchmarks/stub_inference_server.py, so no network is involved.
+# "cold" timings drop the relevant caches before every call, "warm" ones do not.
+
+DEFAULT_SIZES = ["1:100", "5:1000", "20:10000"]
+
+
+def measure(fn, iterations, setup=None, inner=1):
+    samples = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        for _ in range(inner):
+            fn()
+        samples.append((time.perf_counter() - started) / inner)
+    samples.sort()
+    return {
+        "iterations": iterations * inner,
+        "mean_ms": 1000 * statistics.fmean(samples),
+        "p50_ms": 1000 * samples[len(samples) // 2],
+        "p95_ms": 1000 * samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min_ms": 1000 * samples[0],
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(sizes, background_users, iterations, stub_first_token_delay, stub_token_delay):
+    from benchmarks.stub_inference_server import start_stub_server
+    stub = start_stub_server(first_token_delay=stub_first_token_delay, token_delay=stub_token_delay)
+    # Configure the app modules before they are imported.
+    os.environ["MYRITU_CHAT_API_URL"] = stub.url
+    os.environ.setdefault("HF_API_TOKEN", "benchmark")
+    os.environ["MYRITU_RESPONSE_CACHE"] = "0"
+
+    from auth import update_user_profile, get_user_profile
+    from benchmarks.synthetic import REFERENCE_DATE, generate
+    from cache import bump_user_version
+    from chat_jobs import ChatJob
+    from db import SHARDED, get_db_connection, get_Ritu_history, get_chat_history_from_db, get_Ritu_stats, log_chat_message
+    from prediction import predict_next_period
+    from tabs import tab_calendar
+    from tabs.tab_chat import build_chat_payload, generate_user_Ritu_context, run_chat_job
+    from utils import _hormone_graph_frame, generate_hormone_graph_data, get_Ritu_phase
+    import streamlit.logger
+    streamlit.logger.set_log_level("error")  # session_state/ScriptRunContext warnings in bare mode
+
+    conn = get_db_connection()
+    try:
+        generate(conn, background_users, years=5, chat_messages=100)
+        subjects = []
+        for index, size in enumerate(sizes):
+            years, chat_messages = (float(part) for part in size.split(":"))
+            user_id = background_users + index + 1
+            generate(conn, 1, years=years, chat_messages=int(chat_messages), first_user_id=user_id)
+            subjects.append((size, user_id))
+    finally:
+        conn.close()
+    if SHARDED:
+        from split_shards import split_database
+        split_database(prune=True)  # the synthetic data is generated into the main database
+
+    results = []
+
+    def record(size, name, stats):
+        results.append(dict(size=size, name=name, **stats))
+        print(f"  {size:>10} {name:<34} mean {stats['mean_ms']:10.4f} ms  p95 {stats['p95_ms']:10.4f} ms")
+
+    near_day = REFERENCE_DATE + timedelta(days=3)
+    far_day = REFERENCE_DATE + timedelta(days=3650)
+    record("-", "generate_hormone_graph_data cold",
+           measure(lambda: generate_hormone_graph_data(28, points_per_day=4), iterations, setup=_hormone_graph_frame.cache_clear))
+    record("-", "generate_hormone_graph_data warm",
+           measure(lambda: generate_hormone_graph_data(28, points_per_day=4), iterations))
+
+    for size, user_id in subjects:
+        profile = get_user_profile(user_id)
+        last_start = profile["last_period_start"]
+        invalidate = lambda: bump_user_version(user_id)
+
+        record(size, "get_Ritu_history cold", measure(lambda: get_Ritu_history(user_id), iterations, setup=invalidate))
+        record(size, "get_Ritu_history warm", measure(lambda: get_Ritu_history(user_id), iterations))
+        record(size, "get_chat_history_from_db page", measure(lambda: get_chat_history_from_db(user_id), iterations))
+        record(size, "get_Ritu_phase near", measure(
+            lambda: get_Ritu_phase(near_day, last_start, profile["avg_period_length"], profile["avg_Ritu_length"]),
+            iterations, inner=1000))
+        record(size, "get_Ritu_phase far", measure(
+            lambda: get_Ritu_phase(far_day, last_start, profile["avg_period_length"], profile["avg_Ritu_length"]),
+            iterations, inner=1000))
+        record(size, "generate_user_Ritu_context cold",
+               measure(lambda: generate_user_Ritu_context(user_id), iterations, setup=invalidate))
+        record(size, "generate_user_Ritu_context warm", measure(lambda: generate_user_Ritu_context(user_id), iterations))
+
+        def calendar_events():
+            # What show_calendar_tab prepares before rendering the component.
+            current_profile = get_user_profile(user_id)
+            prediction = predict_next_period(get_Ritu_stats(user_id), current_profile.get("last_period_start"),
+                                             current_profile.get("avg_Ritu_length"))
+            window_start, window_end = tab_calendar._calendar_window(REFERENCE_DATE.replace(day=1))
+            return tab_calendar.build_calendar_events(
+                user_id, window_start, window_end, prediction["last_period_start"].isoformat(),
+                current_profile.get("avg_period_length") or 5, prediction["Ritu_length_days"])
+
+        record(size, "calendar events cold", measure(
+            calendar_events, iterations, setup=lambda: (invalidate(), tab_calendar._calendar_events_cache.clear())))
+        record(size, "calendar events warm", measure(calendar_events, iterations))
+        record(size, "update_user_profile", measure(
+            lambda: update_user_profile(user_id, {"preferences": "Benchmark run"}), iterations))
+        # Caller-side latency: with MYRITU_CHAT_LOG_ASYNC (the default) only the enqueue.
+        record(size, "log_chat_message", measure(
+            lambda: log_chat_message(user_id, "user", "Benchmark message"), iterations))
+
+        def chat_reply():
+            job = ChatJob("benchmark", user_id, "benchmark")
+            question = "Why do I get cramps before my period?"
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_chat_job(job, user_id, question, build_chat_payload(user_id, question))
+
+        record(size, "chat reply via stub", measure(chat_reply, max(1, iterations // 5)))
+
+    stub.shutdown()
+    return results
+
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = {(r["size"], r["name"]): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {previous_path} (mean ms, ratio < 1 is faster):")
+    for r in results:
+        before = previous.get((r["size"], r["name"]))
+        if before and before["mean_ms"]:
+            print(f"  {r['size']:>10} {r['name']:<34} {before['mean_ms']:10.4f} -> {r['mean_ms']:10.4f}  "
+                  f"x{r['mean_ms'] / before['mean_ms']:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MyRitu hot-path benchmarks on synthetic data")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="YEARS:CHAT_MESSAGES per measured user")
+    parser.add_argument("--background-users", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--stub-first-token-delay", type=float, default=0.0)
+    parser.add_argument("--stub-token-delay", type=float, default=0.0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="myritu-bench-")
+    os.environ["MYRITU_DB_PATH"] = os.path.join(workdir, "bench.db")
+    print(f"Benchmarking on {os.environ['MYRITU_DB_PATH']}")
+    results = run(args.sizes, args.background_users, args.iterations,
+                  args.stub_first_token_delay, args.stub_token_delay)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "hot_paths", "git_revision": _git_revision(), "python": platform.python_version(),
+                       "platform": platform.platform(), "sizes": args.sizes, "background_users": args.background_users,
+                       "results": results}, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
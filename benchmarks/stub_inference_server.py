@@ -0,0 +1,127 @@
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the Hugging Face text-generation endpoint used by MyRitu Chat.
+# It answers plain requests with [{"generated_text": ...}] and requests with
+# "stream": true with a server-sent event per token, in the same shape as the real API.
+#
+#   python -m benchmarks.stub_inference_server --port 8765
+#   MYRITU_CHAT_API_URL=http://127.0.0.1:8765/ streamlit run main.py
+
+DEFAULT_RESPONSE = (
+    "The luteal phase is the part of your Ritu after ovulation and before your next period. "
+    "Progesterone rises to prepare the uterine lining, and some people notice bloating, breast "
+    "tenderness or mood changes. Gentle exercise, rest and staying hydrated can help, and if "
+    "symptoms feel severe please talk to a healthcare professional."
+)
+
+
+def _tokenize(text):
+    # Word-plus-trailing-space pieces are close enough to model tokens for timing purposes.
+    return re.findall(r"\S+\s*", text)
+
+
+class StubInferenceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            payload = {}
+        with server.lock:
+            server.request_count += 1
+            forced_status = server.fail_statuses.pop(0) if server.fail_statuses else None
+        if forced_status:
+            body = json.dumps({"error": f"stub forced status {forced_status}"}).encode()
+            self.send_response(forced_status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if forced_status in (429, 503):
+                self.send_header("Retry-After", "0")
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        tokens = _tokenize(server.response_text)
+        max_new_tokens = (payload.get("parameters") or {}).get("max_new_tokens")
+        if max_new_tokens:
+            tokens = tokens[:max_new_tokens]
+        time.sleep(server.first_token_delay)
+
+        if payload.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for index, token in enumerate(tokens):
+                if index:
+                    time.sleep(server.token_delay)
+                last = index == len(tokens) - 1
+                event = {
+                    "token": {"id": index, "text": token, "logprob": 0.0, "special": False},
+                    "generated_text": "".join(tokens) if last else None,
+                    "details": None,
+                }
+                self.wfile.write(f"data:{json.dumps(event)}\n\n".encode())
+                self.wfile.flush()
+            self.close_connection = True
+            return
+
+        time.sleep(server.token_delay * max(len(tokens) - 1, 0))
+        body = json.dumps([{"generated_text": "".join(tokens)}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubInferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, response_text=DEFAULT_RESPONSE, first_token_delay=0.2, token_delay=0.02):
+        super().__init__(address, StubInferenceHandler)
+        self.response_text = response_text
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.fail_statuses = []  # e.g. [503, 503] makes the next two requests fail
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+
+def start_stub_server(port=0, **kwargs):
+    # Starts the stub on a background thread; returns the server (server.url, server.shutdown()).
+    server = StubInferenceServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the MyRitu chat inference API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-delay", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between tokens")
+    args = parser.parse_args()
+    stub = StubInferenceServer(("127.0.0.1", args.port), first_token_delay=args.first_token_delay,
+                               token_delay=args.token_delay)
+    print(f"Stub inference server listening on {stub.url}")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,147 @@
+import argparse
+import json
+import random
+import sys
+from datetime import date, timedelta
+
+import bcrypt
+
+# Deterministic synthetic data for benchmarks and load tests: N users, each with M years of
+# logged periods (with symptoms and the odd note) and a chat history. The same arguments
+# always produce the same rows, so timings from different runs are comparable.
+#
+#   MYRITU_DB_PATH=/tmp/bench.db python -m benchmarks.synthetic --users 100 --years 5 --chat-messages 500
+
+REFERENCE_DATE = date(2025, 6, 1)  # "today" for generated data; histories end shortly before it
+SYNTHETIC_PASSWORD = "synthetic-password"
+# Fixed salt so the stored hash (and so the whole database) is reproducible; cost 4 keeps
+# generation fast. Logins against these users still exercise the normal checkpw path.
+SYNTHETIC_PASSWORD_HASH = bcrypt.hashpw(SYNTHETIC_PASSWORD.encode("utf-8"), b"$2b$04$MyRituSyntheticDataXXu")
+
+MOODS = ["Neutral", "Happy", "Sad", "Irritable", "Anxious"]
+FLOWS = ["Not Applicable", "Light", "Medium", "Heavy"]
+LIFE_STAGES = ["Menstruating", "Trying to Conceive", "Pregnant", "Perimenopause"]
+QUESTIONS = [
+    "Why do I get cramps before my period?",
+    "Is a 35 day Ritu normal?",
+    "What can help with bloating in the luteal phase?",
+    "When is my fertile window?",
+    "Why am I so tired this week?",
+    "Can stress delay my period?",
+]
+REPLY = ("That's a great question! Many people notice this around this part of their Ritu. "
+         "Hormone levels shift through each phase, and rest, hydration and gentle movement often help. "
+         "If it feels severe or unusual for you, please check in with a healthcare professional.")
+
+
+def username_for(user_id):
+    return f"synthetic_user_{user_id}"
+
+
+def user_rows(user_id, years, reference_date=REFERENCE_DATE, seed=0):
+    # Returns (profile, periods) for one user; periods are
+    # (period_start_date, period_end_date, symptoms dict, notes), oldest first.
+    rng = random.Random(f"{seed}:{user_id}")
+    base_length = rng.randint(25, 33)
+    period_length = rng.randint(3, 7)
+    start = reference_date - timedelta(days=int(365 * years))
+    periods = []
+    while start < reference_date:
+        end = start + timedelta(days=period_length + rng.randint(-1, 1) - 1)
+        symptoms = None
+        if rng.random() < 0.8:
+            symptoms = {
+                "mood": rng.choice(MOODS),
+                "flow": rng.choice(FLOWS),
+                "pain_cramps": rng.randint(0, 5),
+                "bloating": rng.random() < 0.4,
+                "skin_issues": rng.random() < 0.2,
+                "fatigue": rng.randint(0, 5),
+            }
+        notes = "Felt more tired than usual." if rng.random() < 0.1 else None
+        periods.append((start.isoformat(), end.isoformat() if rng.random() < 0.9 else None, symptoms, notes))
+        start += timedelta(days=max(18, base_length + int(round(rng.gauss(0, 2)))))
+    profile = {
+        "full_name": f"Synthetic User {user_id}",
+        "birth_date": date(1975 + rng.randint(0, 30), rng.randint(1, 12), rng.randint(1, 28)).isoformat(),
+        "avg_Ritu_length": base_length,
+        "avg_period_length": period_length,
+        "last_period_start": periods[-1][0] if periods else None,
+        "life_stage": rng.choice(LIFE_STAGES),
+    }
+    return profile, periods
+
+
+def chat_rows(user_id, messages, seed=0):
+    rng = random.Random(f"{seed}:chat:{user_id}")
+    rows = []
+    for index in range(messages):
+        if index % 2 == 0:
+            rows.append((user_id, "user", rng.choice(QUESTIONS)))
+        else:
+            rows.append((user_id, "bot", REPLY))
+    return rows
+
+
+def generate(conn, users, years, chat_messages=0, seed=0, first_user_id=1, reference_date=REFERENCE_DATE):
+    # Inserts the dataset through conn (a pooled connection); returns row counts.
+    from db import symptom_entry_rows
+    from prediction import rebuild_Ritu_stats
+
+    counts = {"users": 0, "periods": 0, "symptom_entries": 0, "chat_logs": 0}
+    next_Ritu_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM Ritu_data").fetchone()[0]
+    for user_id in range(first_user_id, first_user_id + users):
+        profile, periods = user_rows(user_id, years, reference_date, seed)
+        conn.execute("INSERT INTO users (id, username, password_hash, email) VALUES (?, ?, ?, ?)",
+                     (user_id, username_for(user_id), SYNTHETIC_PASSWORD_HASH, f"{username_for(user_id)}@example.com"))
+        conn.execute(
+            f"INSERT INTO user_profiles (user_id, {', '.join(profile)}) VALUES (?, {', '.join('?' for _ in profile)})",
+            (user_id, *profile.values())
+        )
+        Ritu_rows, symptom_rows = [], []
+        for start, end, symptoms, notes in periods:
+            Ritu_rows.append((next_Ritu_id, user_id, start, end, json.dumps(symptoms) if symptoms else None, notes))
+            symptom_rows.extend(symptom_entry_rows(next_Ritu_id, user_id, start, symptoms))
+            next_Ritu_id += 1
+        conn.executemany(
+            "INSERT INTO Ritu_data (id, user_id, period_start_date, period_end_date, symptoms, notes) VALUES (?, ?, ?, ?, ?, ?)",
+            Ritu_rows
+        )
+        conn.executemany(
+            """INSERT INTO symptom_entries (Ritu_data_id, user_id, period_start_date, name, value_text, value_num)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            symptom_rows
+        )
+        chats = chat_rows(user_id, chat_messages, seed)
+        conn.executemany("INSERT INTO chat_logs (user_id, sender, message) VALUES (?, ?, ?)", chats)
+        rebuild_Ritu_stats(conn.cursor(), user_id)
+        counts["users"] += 1
+        counts["periods"] += len(Ritu_rows)
+        counts["symptom_entries"] += len(symptom_rows)
+        counts["chat_logs"] += len(chats)
+        if user_id % 100 == 0:
+            conn.commit()
+    conn.commit()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic MyRitu data (into MYRITU_DB_PATH)")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--chat-messages", type=int, default=200, help="chat messages per user")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from db import DATABASE_NAME, get_db_connection
+    conn = get_db_connection()
+    try:
+        counts = generate(conn, args.users, args.years, args.chat_messages, args.seed)
+    finally:
+        conn.close()
+    print(f"Wrote {counts} to {DATABASE_NAME}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import os
+import threading
+from collections import OrderedDict
+
+USER_CACHE_MAX_ENTRIES = int(os.getenv("MYRITU_USER_CACHE_MAX_ENTRIES", "2048"))
+
+
+class LRUCache:
+    # Bounded, thread-safe LRU map with hit/miss counters.
+    def __init__(self, max_entries):
+        self.max_entries = max(1, max_entries)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key, default=None):
+        # Lookup that doesn't count towards the stats or the LRU order.
+        with self._lock:
+            return self._data.get(key, default)
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data), "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# --- Per-user data versions ---
+# Every write to a user's profile or Ritu data bumps that user's version. Cache keys
+# include the version, so stale entries are simply never looked up again and age out
+# of the LRU. Versions are per process: writes made by another process are not seen.
+_user_versions = {}
+_versions_lock = threading.Lock()
+
+def get_user_version(user_id):
+    return _user_versions.get(user_id, 0)
+
+def bump_user_version(user_id):
+    with _versions_lock:
+        version = _user_versions.get(user_id, 0) + 1
+        _user_versions[user_id] = version
+        return version
+
+
+# Shared cache for per-user reads (profiles, Ritu history). Keys: (kind, user_id, version).
+user_data_cache = LRUCache(USER_CACHE_MAX_ENTRIES)
+
+def user_cache_key(kind, user_id):
+    return (kind, user_id, get_user_version(user_id))
@@ -0,0 +1,229 @@
+import contextlib
+import importlib.util
+import os
+import threading
+import time
+
+from inference_client import InferenceMetrics, get_inference_client, get_inference_metrics, measure_stream
+
+# Where MyRitu Chat's replies come from. Every backend takes the text-generation payload
+# built by tabs/tab_chat.py ({"inputs": prompt, "parameters": {...}}) and offers
+#   generate(payload)              -> [{"generated_text": ...}], the Inference API's shape
+#   stream(payload, stream_stats)  -> generator of text pieces
+#
+#   remote - the Hugging Face Inference API (or MYRITU_CHAT_API_URL), needs HF_API_TOKEN.
+#   local  - a quantized GGUF instruct model run on this machine's CPU through
+#            llama-cpp-python (optional dependency: pip install llama-cpp-python).
+#            The prompt uses the Zephyr chat template, so a model trained on it such as
+#            TinyLlama-1.1B-Chat (Q4_K_M) works without changes.
+#
+# MYRITU_CHAT_BACKEND=auto (the default) uses the local model when MYRITU_LOCAL_MODEL_PATH
+# is set and the remote endpoint otherwise.
+
+CHAT_MODEL_ID = "HuggingFaceH4/zephyr-7b-beta"
+# Overridable so the chat can run against a local stand-in (benchmarks/stub_inference_server.py)
+API_URL_CHAT = os.getenv("MYRITU_CHAT_API_URL", f"https://api-inference.huggingface.co/models/{CHAT_MODEL_ID}")
+
+CHAT_BACKEND = os.getenv("MYRITU_CHAT_BACKEND", "auto")
+if CHAT_BACKEND not in ("auto", "remote", "local"):
+    raise ValueError(f"MYRITU_CHAT_BACKEND must be 'auto', 'remote' or 'local', not {CHAT_BACKEND!r}")
+
+LOCAL_MODEL_PATH = os.getenv("MYRITU_LOCAL_MODEL_PATH")
+LOCAL_CONTEXT_TOKENS = int(os.getenv("MYRITU_LOCAL_N_CTX", "2048"))
+LOCAL_BATCH_TOKENS = int(os.getenv("MYRITU_LOCAL_N_BATCH", "256"))  # prompt tokens evaluated per step
+# Generations running at once; each needs its own llama.cpp context (KV cache), the model
+# weights are memory-mapped and shared between them.
+LOCAL_MAX_CONCURRENT = max(1, int(os.getenv("MYRITU_LOCAL_MAX_CONCURRENT", "1")))
+# CPU threads per generation; 0 splits the available cores between the concurrent
+# generations so they do not oversubscribe the CPU. Hyperthreads rarely help llama.cpp,
+# so on SMT machines setting this to the physical core count is usually faster.
+LOCAL_THREADS = int(os.getenv("MYRITU_LOCAL_THREADS", "0"))
+LOCAL_QUEUE_TIMEOUT_SECONDS = float(os.getenv("MYRITU_LOCAL_QUEUE_TIMEOUT", "60"))
+LOCAL_STOP_SEQUENCES = ["</s>", "<|user|>", "<|system|>"]
+
+
+class ChatBackendUnavailable(Exception):
+    # The backend cannot answer right now (not installed, model failed to load, all slots busy).
+    pass
+
+
+def _available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class RemoteChatBackend:
+    name = "remote"
+
+    def __init__(self, api_token, api_url=API_URL_CHAT):
+        self.model_id = CHAT_MODEL_ID
+        self.client = get_inference_client(api_url, api_token)
+
+    def generate(self, payload):
+        return self.client.generate(payload)
+
+    def stream(self, payload, stream_stats=None):
+        return self.client.stream(payload, stream_stats)
+
+    def stats(self):
+        return dict(self.client.metrics.snapshot(), backend=self.name, circuit_state=self.client.breaker.state)
+
+
+class LocalChatBackend:
+    # One per process, shared by every session. Models are created lazily, one per
+    # concurrent generation slot, and then kept; a semaphore bounds generations in flight.
+    name = "local"
+
+    def __init__(self, model_path, max_concurrent=LOCAL_MAX_CONCURRENT, n_threads=LOCAL_THREADS,
+                 n_ctx=LOCAL_CONTEXT_TOKENS, n_batch=LOCAL_BATCH_TOKENS, queue_timeout=LOCAL_QUEUE_TIMEOUT_SECONDS):
+        self.model_path = model_path
+        self.model_id = f"local:{os.path.basename(model_path)}"
+        self.max_concurrent = max(1, max_concurrent)
+        self.n_threads = n_threads if n_threads > 0 else max(1, _available_cpus() // self.max_concurrent)
+        self.n_ctx = n_ctx
+        self.n_batch = n_batch
+        self.queue_timeout = queue_timeout
+        self.metrics = InferenceMetrics()
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._idle_models = []
+        self._models_lock = threading.Lock()
+        self._loaded = 0
+        self._load_seconds = 0.0
+
+    def _load_model(self):
+        try:
+            from llama_cpp import Llama  # optional; only needed for the local backend
+        except ImportError as e:
+            raise ChatBackendUnavailable("The local chat backend needs llama-cpp-python (pip install llama-cpp-python).") from e
+        started = time.perf_counter()
+        try:
+            model = Llama(model_path=self.model_path, n_ctx=self.n_ctx, n_batch=self.n_batch, n_threads=self.n_threads,
+                          n_threads_batch=self.n_threads, use_mmap=True, verbose=False)
+        except (OSError, ValueError) as e:
+            raise ChatBackendUnavailable(f"Could not load local chat model {self.model_path}: {e}") from e
+        elapsed = time.perf_counter() - started
+        with self._models_lock:
+            self._loaded += 1
+            self._load_seconds += elapsed
+        print(f"Loaded local chat model {self.model_path} in {elapsed:.1f}s "
+              f"({self.n_threads} threads, slot {self._loaded}/{self.max_concurrent})")
+        return model
+
+    def preload(self):
+        # Loads the first model up front, so the first chat reply does not pay for it.
+        with self._model() as _:
+            pass
+
+    @contextlib.contextmanager
+    def _model(self):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.metrics.incr("busy_rejections")
+            raise ChatBackendUnavailable(f"All {self.max_concurrent} local generation slots stayed busy "
+                                         f"for {self.queue_timeout:.0f}s.")
+        try:
+            with self._models_lock:
+                model = self._idle_models.pop() if self._idle_models else None
+            if model is None:
+                model = self._load_model()
+            try:
+                yield model
+            finally:
+                with self._models_lock:
+                    self._idle_models.append(model)
+        finally:
+            self._slots.release()
+
+    def _completion_args(self, payload):
+        # Inference API parameters -> llama.cpp sampling arguments.
+        parameters = payload.get("parameters") or {}
+        return {
+            "max_tokens": parameters.get("max_new_tokens", 256),
+            "temperature": parameters.get("temperature", 0.7) if parameters.get("do_sample", True) else 0.0,
+            "top_p": parameters.get("top_p", 0.95),
+            "repeat_penalty": parameters.get("repetition_penalty", 1.1),
+            "stop": LOCAL_STOP_SEQUENCES,
+        }
+
+    def generate(self, payload):
+        started = time.perf_counter()
+        self.metrics.incr("requests")
+        try:
+            with self._model() as model:
+                result = model(payload["inputs"], **self._completion_args(payload))
+        except Exception as e:
+            self.metrics.incr("failures")
+            self.metrics.record_error(type(e).__name__)
+            raise
+        self.metrics.incr("successes")
+        self.metrics.record_latency(time.perf_counter() - started)
+        return [{"generated_text": result["choices"][0]["text"]}]
+
+    def stream(self, payload, stream_stats=None):
+        # Same stream_stats as InferenceClient.stream: time to first token and throughput.
+        started = time.perf_counter()
+        token_count = 0
+        first_token_at = None
+        self.metrics.incr("requests")
+        try:
+            with self._model() as model:
+                for chunk in model(payload["inputs"], stream=True, **self._completion_args(payload)):
+                    text = chunk["choices"][0]["text"]
+                    if not text:
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    token_count += 1
+                    yield text
+        except Exception as e:
+            self.metrics.incr("failures")
+            self.metrics.record_error(type(e).__name__)
+            raise
+        self.metrics.incr("successes")
+        measured = measure_stream(started, first_token_at, time.perf_counter(), token_count)
+        self.metrics.record_stream(measured)
+        if stream_stats is not None:
+            stream_stats.update(measured)
+
+    def stats(self):
+        with self._models_lock:
+            models = {"models_loaded": self._loaded, "model_load_seconds": self._load_seconds,
+                      "idle_models": len(self._idle_models)}
+        return dict(self.metrics.snapshot(), backend=self.name, model=self.model_path, threads=self.n_threads,
+                    max_concurrent=self.max_concurrent, **models)
+
+
+# --- Backend selection ---
+_local_backend = None
+_local_backend_lock = threading.Lock()
+
+def chat_backend_name():
+    if CHAT_BACKEND == "auto":
+        return "local" if LOCAL_MODEL_PATH else "remote"
+    return CHAT_BACKEND
+
+def get_local_backend():
+    global _local_backend
+    if _local_backend is None:
+        with _local_backend_lock:
+            if _local_backend is None:
+                if not LOCAL_MODEL_PATH:
+                    raise ChatBackendUnavailable("Set MYRITU_LOCAL_MODEL_PATH to a GGUF model to use the local chat backend.")
+                _local_backend = LocalChatBackend(LOCAL_MODEL_PATH)
+    return _local_backend
+
+def get_chat_backend(api_token):
+    if chat_backend_name() == "local":
+        return get_local_backend()
+    return RemoteChatBackend(api_token)
+
+def chat_backend_available(api_token):
+    # Cheap check for the chat tab: is there anything to send a question to? (Loads nothing.)
+    if chat_backend_name() == "local":
+        return bool(LOCAL_MODEL_PATH) and os.path.exists(LOCAL_MODEL_PATH) and importlib.util.find_spec("llama_cpp") is not None
+    return bool(api_token)
+
+def get_chat_backend_stats():
+    if chat_backend_name() == "local":
+        return _local_backend.stats() if _local_backend is not None else None
+    return get_inference_metrics()
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from db import get_db_connection
+
+# Chat replies are generated off the Streamlit script thread: the tab submits a job and
+# polls it until it is done. Jobs are persisted in chat_jobs with a unique request key,
+# so a rerun can never start a second generation for the same message.
+CHAT_JOB_WORKERS = int(os.getenv("MYRITU_CHAT_WORKERS", "4"))
+CHAT_JOB_MAX_QUEUED = int(os.getenv("MYRITU_CHAT_MAX_QUEUED", "32"))
+CHAT_JOB_MAX_PER_USER = int(os.getenv("MYRITU_CHAT_MAX_PER_USER", "2"))  # queued or running, across processes
+# In-flight rows older than this are left over from a process that died and no longer count.
+CHAT_JOB_STALE_SECONDS = 600
+# Rows (and the replies they hold) are deleted once untouched this long; by then the reply
+# has been shown and logged to chat_logs.
+CHAT_JOB_RETENTION_SECONDS = int(os.getenv("MYRITU_CHAT_JOB_RETENTION", "3600"))
+CHAT_JOB_MEMORY_LIMIT = 1000  # finished jobs kept in memory for polling before falling back to the table
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class ChatQueueFullError(Exception):
+    pass
+
+
+class ChatJobError(Exception):
+    # Raised by job functions to fail a job with a reply that is still shown to the user.
+    def __init__(self, message, user_message):
+        super().__init__(message)
+        self.user_message = user_message
+
+
+class ChatJob:
+    def __init__(self, job_id, user_id, request_key, status=QUEUED, result=None, error=None):
+        self.id = job_id
+        self.user_id = user_id
+        self.request_key = request_key
+        self.status = status
+        self.result = result
+        self.error = error
+        self.partial = ""  # text produced so far, for streaming progress
+        self.message_id = None  # log_chat_message() result for the reply (see db.chat_log_id)
+        self._lock = threading.Lock()
+
+    def append_partial(self, text):
+        with self._lock:
+            self.partial += text
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+_stats = {"submitted": 0, "deduplicated": 0, "rejected": 0, "rejected_per_user": 0, "completed": 0, "failed": 0,
+          "queued": 0, "running": 0, "max_queue_depth": 0}
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=CHAT_JOB_WORKERS, thread_name_prefix="myritu-chat")
+    return _executor
+
+def _remember(job):
+    with _jobs_lock:
+        _jobs[job.id] = job
+        _jobs.move_to_end(job.id)
+        while len(_jobs) > CHAT_JOB_MEMORY_LIMIT:
+            oldest_id, oldest = next(iter(_jobs.items()))
+            if not oldest.finished:
+                break
+            del _jobs[oldest_id]
+
+def _persist_status(job):
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            "UPDATE chat_jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+            (job.status, job.result, job.error, time.time(), job.id)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error updating chat job {job.id}: {e}")
+    finally:
+        conn.close()
+
+def _run(job, fn, args):
+    with _jobs_lock:
+        _stats["queued"] -= 1
+        _stats["running"] += 1
+    job.status = RUNNING
+    _persist_status(job)
+    try:
+        job.result = fn(job, *args)
+        job.status = DONE
+    except ChatJobError as e:
+        job.result, job.error, job.status = e.user_message, str(e), FAILED
+    except Exception as e:
+        job.error, job.status = f"{type(e).__name__}: {e}", FAILED
+    finally:
+        with _jobs_lock:
+            _stats["running"] -= 1
+            _stats["completed" if job.status == DONE else "failed"] += 1
+        _persist_status(job)
+
+def submit_chat_job(user_id, request_key, fn, *args):
+    # Runs fn(job, *args) on the worker pool and returns the job id. Submitting a request
+    # key that already has a job returns that job's id instead of generating again.
+    with _jobs_lock:
+        # The slot is taken under the lock, so concurrent submits cannot overshoot the bound.
+        if _stats["queued"] >= CHAT_JOB_MAX_QUEUED:
+            _stats["rejected"] += 1
+            raise ChatQueueFullError("Too many chat replies are waiting; please try again shortly.")
+        _stats["queued"] += 1
+    job = ChatJob(uuid.uuid4().hex, user_id, request_key)
+    now = time.time()
+    submitted = False
+    conn = get_db_connection()
+    try:
+        # One statement, so the per-user count and the insert happen under the same write
+        # lock: two submits for one user cannot both see room for one more job.
+        cursor = conn.execute(
+            """INSERT OR IGNORE INTO chat_jobs (id, user_id, request_key, status, created_at, updated_at)
+               SELECT ?, ?, ?, ?, ?, ?
+               WHERE (SELECT COUNT(*) FROM chat_jobs
+                      WHERE user_id = ? AND status IN (?, ?) AND updated_at > ?) < ?""",
+            (job.id, user_id, request_key, QUEUED, now, now,
+             user_id, QUEUED, RUNNING, now - CHAT_JOB_STALE_SECONDS, CHAT_JOB_MAX_PER_USER)
+        )
+        inserted = cursor.rowcount
+        # Finished jobs past retention go in the same transaction (in-flight rows that old
+        # were left behind by a dead process).
+        conn.execute("DELETE FROM chat_jobs WHERE updated_at < ?", (now - CHAT_JOB_RETENTION_SECONDS,))
+        conn.commit()
+        if inserted == 0:
+            existing = conn.execute("SELECT id FROM chat_jobs WHERE request_key = ?", (request_key,)).fetchone()
+            if existing is None:
+                with _jobs_lock:
+                    _stats["rejected_per_user"] += 1
+                raise ChatQueueFullError("You already have replies on the way; please wait for them first.")
+            with _jobs_lock:
+                _stats["deduplicated"] += 1
+            return existing["id"]
+        submitted = True
+    finally:
+        conn.close()
+        if not submitted:
+            with _jobs_lock:
+                _stats["queued"] -= 1
+    with _jobs_lock:
+        _stats["submitted"] += 1
+        _stats["max_queue_depth"] = max(_stats["max_queue_depth"], _stats["queued"])
+    _remember(job)
+    _get_executor().submit(_run, job, fn, args)
+    return job.id
+
+def make_request_key(*parts):
+    # Deterministic request key: the same parts (e.g. session, turn and message text)
+    # always map to the same job.
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+def get_chat_job(job_id):
+    job = _jobs.get(job_id)
+    if job is not None:
+        return job
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT * FROM chat_jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    job = ChatJob(row["id"], row["user_id"], row["request_key"], row["status"], row["result"], row["error"])
+    if not job.finished:
+        # Persisted as in flight but unknown to this process: its worker died with a restart.
+        job.status, job.error = FAILED, "Interrupted before completion."
+        _persist_status(job)
+    return job
+
+def chat_job_stats():
+    with _jobs_lock:
+        stats = dict(_stats)
+    stats["workers"] = CHAT_JOB_WORKERS
+    stats["max_queued"] = CHAT_JOB_MAX_QUEUED
+    stats["max_per_user"] = CHAT_JOB_MAX_PER_USER
+    return stats
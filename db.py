@@ -1,110 +1,285 @@
 import sqlite3
 import datetime
+import glob
 import json
+import atexit
+import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 
-DATABASE_NAME = 'MyRitu.db'
+from batch_writer import BatchWriter
+from cache import user_data_cache, user_cache_key, bump_user_version
+from db_pool import get_pool, close_pool
+from instrumentation import timed
+from migrations import run_migrations
+from prediction import update_Ritu_stats, rebuild_Ritu_stats
+
+DATABASE_NAME = os.getenv("MYRITU_DB_PATH", 'MyRitu.db')
+
+# --- Storage layout ---
+# "single": everything lives in DATABASE_NAME. "sharded": DATABASE_NAME keeps the users
+# directory, chat jobs and the response cache, and each user's own rows (USER_SHARD_TABLES)
+# live in a shard file under SHARD_DIR, so writes for different users don't queue behind
+# one SQLite writer lock. SHARD_BUCKETS = 0 gives every user their own file; N > 0 spreads
+# users over N bucket files by id. Existing single databases are split with split_shards.py.
+STORAGE_MODE = os.getenv("MYRITU_STORAGE_MODE", "single")
+if STORAGE_MODE not in ("single", "sharded"):
+    raise ValueError(f"MYRITU_STORAGE_MODE must be 'single' or 'sharded', not {STORAGE_MODE!r}")
+SHARDED = STORAGE_MODE == "sharded"
+SHARD_DIR = os.getenv("MYRITU_SHARD_DIR", os.path.splitext(DATABASE_NAME)[0] + "_shards")
+SHARD_BUCKETS = int(os.getenv("MYRITU_SHARD_BUCKETS", "0"))
+SHARD_POOL_SIZE = int(os.getenv("MYRITU_SHARD_POOL_SIZE", "2"))  # connections per shard file
+USER_SHARD_TABLES = ("user_profiles", "Ritu_data", "symptom_entries", "Ritu_stats", "user_predictions", "chat_logs")
+SHARD_LAYOUT_FILE = "layout.json"
+
+class UnknownUserError(LookupError):
+    # Sharded storage only routes users that have a users row, so a deleted user's session
+    # or an in-flight job can't bring their shard file back.
+    pass
 
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
+    # Connections come from a process-wide pool (WAL mode, tuned pragmas);
+    # conn.close() returns the connection to the pool instead of closing it.
+    return get_pool(DATABASE_NAME).connection()
 
-def init_db():
+def shard_path(user_id):
+    # Ids are assigned sequentially, so id modulo the bucket count spreads users evenly.
+    if SHARD_BUCKETS > 0:
+        return os.path.join(SHARD_DIR, f"bucket_{int(user_id) % SHARD_BUCKETS:04d}.db")
+    return os.path.join(SHARD_DIR, f"user_{int(user_id)}.db")
+
+def connect_database(database, max_size=None, create=False):
+    # A pooled connection to any database file, migrated on first use in this process.
+    # A missing file is only created when create is set (signup, split_shards.py).
+    if not create and not os.path.exists(database):
+        raise sqlite3.OperationalError(f"unable to open database file: {database} does not exist")
+    _ensure_migrated(database, max_size)
+    return get_pool(database, max_size).connection()
+
+def user_exists(user_id):
+    # Only positive answers are cached; deleting a user bumps their version, which drops it.
+    cache_key = user_cache_key("exists", user_id)
+    if user_data_cache.get(cache_key):
+        return True
     conn = get_db_connection()
-    cursor = conn.cursor()
+    try:
+        exists = conn.execute("SELECT 1 FROM users WHERE id = ?", (user_id,)).fetchone() is not None
+    finally:
+        conn.close()
+    if exists:
+        user_data_cache.put(cache_key, True)
+    return exists
 
-    # Users table (no changes)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            email TEXT UNIQUE,
-            registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    # User profiles table (no changes from previous version with life_stage)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_profiles (
-            user_id INTEGER PRIMARY KEY,
-            full_name TEXT,
-            birth_date TEXT,
-            avg_Ritu_length INTEGER DEFAULT 28,
-            avg_period_length INTEGER DEFAULT 5,
-            last_period_start TEXT,
-            medical_conditions TEXT,
-            medications TEXT,
-            preferences TEXT,
-            life_stage TEXT,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
+def get_user_db_connection(user_id, create=False):
+    # The database holding user_id's profile, history, stats, predictions and chat log.
+    # Sharded, the user must exist and so must their shard file, unless create is set
+    # (only at signup): other callers never create one.
+    if not SHARDED:
+        return get_db_connection()
+    if not user_exists(user_id):
+        raise UnknownUserError(f"No user with id {user_id}")
+    return connect_database(shard_path(user_id), SHARD_POOL_SIZE, create)
+
+def iter_user_databases():
+    # Every database file that holds user rows (for batch jobs such as precompute.py).
+    if not SHARDED:
+        return [DATABASE_NAME]
+    return sorted(glob.glob(os.path.join(SHARD_DIR, "*.db")))
+
+def get_db_pool_stats():
+    return get_pool(DATABASE_NAME).stats()
+
+_migrated_databases = set()
+_migration_lock = threading.Lock()
+
+def _ensure_migrated(database, max_size=None):
+    # Schema changes live in migrations.py and are applied at most once per process
+    # per database file; later calls (e.g. every Streamlit rerun of main.py) are a set lookup.
+    # Shards get the full schema too; only their user tables are used.
+    if database in _migrated_databases:
+        return
+    with _migration_lock:
+        if database in _migrated_databases:
+            return
+        if database != DATABASE_NAME:
+            os.makedirs(os.path.dirname(database) or ".", exist_ok=True)
+        conn = get_pool(database, max_size).connection()
+        try:
+            run_migrations(conn)
+        finally:
+            conn.close()
+        _migrated_databases.add(database)
+
+def _check_shard_layout():
+    # Users are found by id and bucket count, so the count can't change once shards exist.
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    layout_path = os.path.join(SHARD_DIR, SHARD_LAYOUT_FILE)
     try:
-        cursor.execute("ALTER TABLE user_profiles ADD COLUMN life_stage TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass # Column likely already exists
-
-    # Ritu data table (no changes)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Ritu_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            period_start_date TEXT NOT NULL,
-            period_end_date TEXT,
-            symptoms TEXT,
-            notes TEXT,
-            logged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
-
-    # --- New Chat Logs Table ---
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS chat_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            sender TEXT NOT NULL, -- "user" or "bot"
-            message TEXT NOT NULL,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
-    conn.commit()
-    conn.close()
+        with open(layout_path) as f:
+            layout = json.load(f)
+    except FileNotFoundError:
+        layout = None
+    if layout is not None:
+        if layout.get("buckets") != SHARD_BUCKETS:
+            raise RuntimeError(f"{SHARD_DIR} was laid out with MYRITU_SHARD_BUCKETS={layout.get('buckets')}, "
+                               f"not {SHARD_BUCKETS}")
+        return
+    with open(layout_path, "w") as f:
+        json.dump({"buckets": SHARD_BUCKETS}, f)
+    conn = get_db_connection()
+    try:
+        unsplit = conn.execute("SELECT 1 FROM user_profiles LIMIT 1").fetchone() is not None
+    finally:
+        conn.close()
+    if unsplit:
+        print(f"Warning: {DATABASE_NAME} still holds user data; run split_shards.py to move it into {SHARD_DIR}.")
 
+def init_db():
+    _ensure_migrated(DATABASE_NAME)
+    if SHARDED and DATABASE_NAME not in _checked_layouts:
+        _check_shard_layout()
+        _checked_layouts.add(DATABASE_NAME)
+
+_checked_layouts = set()
 init_db()
 
 # --- Functions for Chat Logs ---
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv("MYRITU_CHAT_PAGE_SIZE", "50"))
+# Chat messages are written behind by a background thread in group commits (see
+# batch_writer.py) unless MYRITU_CHAT_LOG_ASYNC=0.
+CHAT_LOG_ASYNC = os.getenv("MYRITU_CHAT_LOG_ASYNC", "1") != "0"
+CHAT_LOG_MAX_BATCH = int(os.getenv("MYRITU_CHAT_LOG_MAX_BATCH", "256"))
+CHAT_LOG_MAX_LATENCY_MS = float(os.getenv("MYRITU_CHAT_LOG_MAX_LATENCY_MS", "50"))
+CHAT_LOG_MAX_QUEUED = 10000
+CHAT_LOG_FLUSH_TIMEOUT_SECONDS = 10.0
+
+_chat_log_writer = None
+_chat_log_writer_lock = threading.Lock()
+
+def _write_chat_log_batch(rows):
+    # One transaction per database (a single one unless storage is sharded). Returns each
+    # row's new chat_logs id, None for rows whose transaction failed: nothing of theirs was
+    # committed, so the writer can retry exactly those. Rows of users deleted since they were
+    # queued get False.
+    ids = [None] * len(rows)
+    by_database = {}
+    for index, row in enumerate(rows):
+        if SHARDED and not user_exists(row[0]):
+            ids[index] = False  # deleted meanwhile: dropped, not retried
+            continue
+        by_database.setdefault(shard_path(row[0]) if SHARDED else DATABASE_NAME, []).append(index)
+    for database, indexes in by_database.items():
+        conn = None
+        try:
+            # Pool exhaustion raises here too.
+            conn = connect_database(database, SHARD_POOL_SIZE) if SHARDED else get_db_connection()
+            cursor = conn.cursor()
+            written = []
+            for index in indexes:
+                cursor.execute(
+                    "INSERT INTO chat_logs (user_id, sender, message, timestamp) VALUES (?, ?, ?, ?)",
+                    rows[index]
+                )
+                written.append((index, cursor.lastrowid))
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error logging chat messages: {e}")
+            continue
+        finally:
+            if conn is not None:
+                conn.close()  # rolls back a transaction left unfinished
+        for index, row_id in written:
+            ids[index] = row_id
+    return ids
+
+def _get_chat_log_writer():
+    global _chat_log_writer
+    if _chat_log_writer is None:
+        with _chat_log_writer_lock:
+            if _chat_log_writer is None:
+                _chat_log_writer = BatchWriter(_write_chat_log_batch, CHAT_LOG_MAX_BATCH, CHAT_LOG_MAX_LATENCY_MS / 1000,
+                                               CHAT_LOG_MAX_QUEUED, name="chat log")
+                atexit.register(_chat_log_writer.close)  # queued messages are written on shutdown
+    return _chat_log_writer
+
+def flush_chat_log(user_id=None, timeout=CHAT_LOG_FLUSH_TIMEOUT_SECONDS):
+    # Blocks until queued chat messages (user_id's, or everyone's) are in the database.
+    if _chat_log_writer is None:
+        return True
+    return _chat_log_writer.flush(user_id, timeout)
+
+def get_chat_log_writer_stats():
+    return _chat_log_writer.stats() if _chat_log_writer is not None else None
+
+@timed
 def log_chat_message(user_id, sender, message):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Returns the new message id when written directly and False on failure. With the
+    # background writer (CHAT_LOG_ASYNC) it returns a Future instead, which resolves to the
+    # id once the message's batch commits (or to False); chat_log_id() unwraps either.
+    if CHAT_LOG_ASYNC:
+        # CURRENT_TIMESTAMP format, taken now rather than when the batch commits.
+        timestamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        future = _get_chat_log_writer().submit(user_id, (user_id, sender, message, timestamp))
+        if future is not None:
+            return future
+    conn = None
     try:
+        conn = get_user_db_connection(user_id)
+        cursor = conn.cursor()
         cursor.execute(
             "INSERT INTO chat_logs (user_id, sender, message) VALUES (?, ?, ?)",
             (user_id, sender, message)
         )
         conn.commit()
-        return True
-    except sqlite3.Error as e:
+        return cursor.lastrowid
+    except (sqlite3.Error, UnknownUserError) as e:
         print(f"Error logging chat message: {e}")
         return False
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
 
-def get_chat_history_from_db(user_id, limit=50): # Get recent messages for display
-    conn = get_db_connection()
-    messages = conn.execute(
-        "SELECT sender, message FROM chat_logs WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?",
-        (user_id, limit)
-    ).fetchall()
-    conn.close()
+def chat_log_id(logged, timeout=0):
+    # The chat_logs id behind a log_chat_message() result: an id as is, a queued write's id
+    # once its batch has committed (waiting up to timeout seconds), otherwise None.
+    if isinstance(logged, Future):
+        try:
+            logged = logged.result(timeout)
+        except FutureTimeoutError:
+            return None
+    return logged or None
+
+@timed
+def get_chat_history_from_db(user_id, limit=None, before_id=None): # Get recent messages for display
+    # Keyset pagination on chat_logs.id: the newest `limit` messages, or the page just
+    # older than message `before_id`. Served by idx_chat_logs_user_id without a sort.
+    # The user's queued messages are written first, so a session always reads its own writes.
+    flush_chat_log(user_id)
+    limit = limit or CHAT_HISTORY_PAGE_SIZE
+    conn = get_user_db_connection(user_id)
+    try:
+        if before_id is None:
+            messages = conn.execute(
+                "SELECT id, sender, message FROM chat_logs WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+                (user_id, limit)
+            ).fetchall()
+        else:
+            messages = conn.execute(
+                "SELECT id, sender, message FROM chat_logs WHERE user_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (user_id, before_id, limit)
+            ).fetchall()
+    finally:
+        conn.close()
     # Return in chronological order for display
-    return [{"sender": msg["sender"], "message": msg["message"]} for msg in reversed(messages)]
+    return [{"id": msg["id"], "sender": msg["sender"], "message": msg["message"]} for msg in reversed(messages)]
 
 
 # --- Function to Delete User Data (Factory Reset) ---
+@timed
 def delete_user_data(user_id):
+    flush_chat_log(user_id)  # nothing queued may land after the delete
+    if SHARDED:
+        return _delete_sharded_user_data(user_id)
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
@@ -112,10 +287,16 @@ def delete_user_data(user_id):
         # For simplicity, we assume ON DELETE CASCADE is not strictly enforced by default in SQLite python lib
         # or that we delete in an order that respects dependencies.
         cursor.execute("DELETE FROM chat_logs WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM symptom_entries WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM Ritu_stats WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM user_predictions WHERE user_id = ?", (user_id,))
         cursor.execute("DELETE FROM Ritu_data WHERE user_id = ?", (user_id,))
         cursor.execute("DELETE FROM user_profiles WHERE user_id = ?", (user_id,))
+        cursor.execute("DELETE FROM chat_jobs WHERE user_id = ?", (user_id,))  # their results are replies
+        cursor.execute("DELETE FROM chat_response_cache WHERE user_id = ?", (user_id,))
         cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
         conn.commit()
+        bump_user_version(user_id)
         return True, "All your data has been successfully deleted."
     except sqlite3.Error as e:
         print(f"Error deleting user data: {e}")
@@ -123,9 +304,118 @@ def delete_user_data(user_id):
     finally:
         conn.close()
 
-# Existing functions (log_period_data, get_Ritu_history) remain the same
-def log_period_data(user_id, period_start_date, period_end_date=None, symptoms=None, notes=None):
+def _remove_database_file(database):
+    close_pool(database)
+    _migrated_databases.discard(database)
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(database + suffix)
+        except FileNotFoundError:
+            pass
+
+def _delete_sharded_user_data(user_id):
+    # The users row goes first: once it is gone nothing routes to the shard any more.
     conn = get_db_connection()
+    try:
+        conn.execute("DELETE FROM chat_jobs WHERE user_id = ?", (user_id,))
+        conn.execute("DELETE FROM chat_response_cache WHERE user_id = ?", (user_id,))
+        conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error deleting user data: {e}")
+        return False, f"An error occurred while deleting your data: {e}"
+    finally:
+        conn.close()
+    bump_user_version(user_id)
+    try:
+        if SHARD_BUCKETS > 0:
+            if not os.path.exists(shard_path(user_id)):
+                return True, "All your data has been successfully deleted."
+            shard = connect_database(shard_path(user_id), SHARD_POOL_SIZE)
+            try:
+                for table in USER_SHARD_TABLES:
+                    shard.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+                shard.commit()
+            finally:
+                shard.close()
+        else:
+            _remove_database_file(shard_path(user_id))  # the whole file is this user's data
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error deleting user data: {e}")
+        return False, f"An error occurred while deleting your data: {e}"
+    return True, "All your data has been successfully deleted."
+
+# --- Symptom storage ---
+# The JSON blob in Ritu_data.symptoms is kept for display; symptom_entries holds the
+# same values one row per symptom so aggregates run as indexed SQL.
+def symptom_entry_rows(Ritu_data_id, user_id, period_start_date, symptoms):
+    rows = []
+    for name, value in (symptoms or {}).items():
+        value_text, value_num = None, None
+        if isinstance(value, (bool, int, float)):
+            value_num = float(value)
+        elif isinstance(value, str):
+            value_text = value
+        elif value is not None:
+            continue # nested values are not aggregated
+        rows.append((Ritu_data_id, user_id, period_start_date, name, value_text, value_num))
+    return rows
+
+def _insert_symptom_entries(cursor, rows):
+    cursor.executemany(
+        """INSERT INTO symptom_entries
+           (Ritu_data_id, user_id, period_start_date, name, value_text, value_num)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        rows
+    )
+
+@timed
+def get_symptom_value_counts(user_id, name):
+    # e.g. mood frequency: [("Happy", 4), ("Sad", 2), ...], most frequent first
+    conn = get_user_db_connection(user_id)
+    try:
+        rows = conn.execute(
+            """SELECT value_text, COUNT(*) AS count FROM symptom_entries
+               WHERE user_id = ? AND name = ? AND value_text IS NOT NULL
+               GROUP BY value_text ORDER BY count DESC, value_text""",
+            (user_id, name)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [(row["value_text"], row["count"]) for row in rows]
+
+@timed
+def get_symptom_series(user_id, name):
+    # e.g. pain trend: [("2024-01-03", 3.0), ...], oldest first
+    conn = get_user_db_connection(user_id)
+    try:
+        rows = conn.execute(
+            """SELECT period_start_date, value_num FROM symptom_entries
+               WHERE user_id = ? AND name = ? AND value_num IS NOT NULL
+               ORDER BY period_start_date""",
+            (user_id, name)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [(row["period_start_date"], row["value_num"]) for row in rows]
+
+@timed
+def get_symptom_stats(user_id):
+    # {name: {"count", "avg", "max"}} for every symptom the user has logged
+    conn = get_user_db_connection(user_id)
+    try:
+        rows = conn.execute(
+            """SELECT name, COUNT(*) AS count, AVG(value_num) AS avg, MAX(value_num) AS max
+               FROM symptom_entries WHERE user_id = ? GROUP BY name""",
+            (user_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return {row["name"]: {"count": row["count"], "avg": row["avg"], "max": row["max"]} for row in rows}
+
+@timed
+def log_period_data(user_id, period_start_date, period_end_date=None, symptoms=None, notes=None):
+    conn = get_user_db_connection(user_id)
     cursor = conn.cursor()
     try:
         symptoms_json = json.dumps(symptoms) if symptoms else None
@@ -135,7 +425,10 @@ def log_period_data(user_id, period_start_date, period_end_date=None, symptoms=N
                VALUES (?, ?, ?, ?, ?)""",
             (user_id, period_start_date, period_end_date, symptoms_json, notes)
         )
+        _insert_symptom_entries(cursor, symptom_entry_rows(cursor.lastrowid, user_id, period_start_date, symptoms))
+        update_Ritu_stats(cursor, user_id, period_start_date)
         conn.commit()
+        bump_user_version(user_id)
         return True, "Period data logged successfully."
     except sqlite3.Error as e:
         print(f"Error in log_period_data: {e}")
@@ -143,22 +436,125 @@ def log_period_data(user_id, period_start_date, period_end_date=None, symptoms=N
     finally:
         conn.close()
 
-def get_Ritu_history(user_id):
-    conn = get_db_connection()
-    history_cursor = conn.execute(
-        "SELECT * FROM Ritu_data WHERE user_id = ? ORDER BY period_start_date DESC",
-        (user_id,)
-    )
-    history_rows = history_cursor.fetchall()
-    conn.close()
-    processed_history = []
-    for row in history_rows:
-        item = dict(row)
-        if item.get('symptoms'):
-            try: item['symptoms'] = json.loads(item['symptoms'])
-            except json.JSONDecodeError: item['symptoms'] = {} 
-        processed_history.append(item)
-    return processed_history
+def _copy_history(history):
+    # Cached history is shared; callers get their own dicts (and symptom dicts) to mutate.
+    return [dict(item, symptoms=dict(item['symptoms'])) if isinstance(item.get('symptoms'), dict) else dict(item)
+            for item in history]
+
+def _decode_symptoms(value):
+    try: return json.loads(value)
+    except json.JSONDecodeError: return {}
+
+def _history_item(row):
+    item = dict(row)
+    if item.get('symptoms'):
+        item['symptoms'] = _decode_symptoms(item['symptoms'])
+    return item
+
+@timed
+def get_Ritu_history(user_id, limit=None):
+    # Newest first. With a limit and no cached copy, only that many rows are read.
+    cache_key = user_cache_key("history", user_id)
+    cached = user_data_cache.get(cache_key)
+    if cached is not None:
+        return _copy_history(cached[:limit] if limit else cached)
+    conn = get_user_db_connection(user_id)
+    try:
+        if limit:
+            history_rows = conn.execute(
+                "SELECT * FROM Ritu_data WHERE user_id = ? ORDER BY period_start_date DESC LIMIT ?",
+                (user_id, limit)
+            ).fetchall()
+            return [_history_item(row) for row in history_rows]
+        history_cursor = conn.execute(
+            "SELECT * FROM Ritu_data WHERE user_id = ? ORDER BY period_start_date DESC",
+            (user_id,)
+        )
+        history_rows = history_cursor.fetchall()
+    finally:
+        conn.close()
+    processed_history = [_history_item(row) for row in history_rows]
+    user_data_cache.put(cache_key, processed_history)
+    return _copy_history(processed_history)
+
+@timed
+def get_Ritu_history_range(user_id, start_date, end_date):
+    # Entries whose period starts between start_date and end_date (inclusive, 'YYYY-MM-DD'),
+    # oldest first; an index range scan, so the cost follows the range rather than the history.
+    conn = get_user_db_connection(user_id)
+    try:
+        rows = conn.execute(
+            """SELECT * FROM Ritu_data WHERE user_id = ? AND period_start_date BETWEEN ? AND ?
+               ORDER BY period_start_date""",
+            (user_id, start_date, end_date)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [_history_item(row) for row in rows]
+
+@timed
+def get_Ritu_stats(user_id):
+    # The running Ritu length estimate (see prediction.py), or None before any period is logged.
+    cache_key = user_cache_key("Ritu_stats", user_id)
+    cached = user_data_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached) if cached else None
+    conn = get_user_db_connection(user_id)
+    try:
+        row = conn.execute("SELECT * FROM Ritu_stats WHERE user_id = ?", (user_id,)).fetchone()
+    finally:
+        conn.close()
+    stats = dict(row) if row else {}
+    user_data_cache.put(cache_key, stats)
+    return dict(stats) if stats else None
+
+@timed
+def rebuild_user_Ritu_stats(user_id):
+    # Recomputes a user's Ritu_stats from their whole history (e.g. after edits outside log_period_data).
+    conn = get_user_db_connection(user_id)
+    try:
+        rebuild_Ritu_stats(conn.cursor(), user_id)
+        conn.commit()
+    finally:
+        conn.close()
+    bump_user_version(user_id)
+
+RITU_DATA_COLUMNS = ('id', 'user_id', 'period_start_date', 'period_end_date', 'symptoms', 'notes', 'logged_at')
+_DATE_COLUMN_FORMATS = {'period_start_date': '%Y-%m-%d', 'period_end_date': '%Y-%m-%d', 'logged_at': '%Y-%m-%d %H:%M:%S'}
+
+@timed
+def load_Ritu_history_df(user_id, columns=None, start_date=None, end_date=None):
+    # Ritu_data rows as a DataFrame, oldest first, built straight from cursor tuples.
+    # Only the requested columns are read; date columns come back as datetime64
+    # (unparseable values as NaT) and symptoms, when requested, as decoded dicts.
+    columns = list(columns or RITU_DATA_COLUMNS)
+    unknown = [column for column in columns if column not in RITU_DATA_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown Ritu_data columns: {', '.join(unknown)}")
+    query = f"SELECT {', '.join(columns)} FROM Ritu_data WHERE user_id = ?"
+    params = [user_id]
+    if start_date:
+        query += " AND period_start_date >= ?"
+        params.append(str(start_date)[:10])
+    if end_date:
+        query += " AND period_start_date <= ?"
+        params.append(str(end_date)[:10])
+    query += " ORDER BY period_start_date"
+    conn = get_user_db_connection(user_id)
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None  # plain tuples; the connection default builds sqlite3.Row objects
+        rows = cursor.execute(query, params).fetchall()
+    finally:
+        conn.close()
+    import pandas as pd  # deferred: only the analytics tabs pay for importing pandas
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    for column in columns:
+        if column in _DATE_COLUMN_FORMATS:
+            df[column] = pd.to_datetime(df[column], format=_DATE_COLUMN_FORMATS[column], errors='coerce')
+    if 'symptoms' in columns:
+        df['symptoms'] = [_decode_symptoms(value) if isinstance(value, str) else None for value in df['symptoms']]
+    return df
 
 if __name__ == '__main__':
     print("Database initialized/checked (db.py executed).")
\ No newline at end of file
@@ -0,0 +1,231 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from instrumentation import CURSOR_FACTORY
+
+# --- Pool settings (overridable through the environment) ---
+POOL_MAX_SIZE = int(os.getenv("MYRITU_DB_POOL_SIZE", "8"))
+POOL_TIMEOUT_SECONDS = float(os.getenv("MYRITU_DB_POOL_TIMEOUT", "10"))
+BUSY_TIMEOUT_MS = int(os.getenv("MYRITU_DB_BUSY_TIMEOUT_MS", "5000"))
+CACHE_SIZE_KIB = int(os.getenv("MYRITU_DB_CACHE_SIZE_KIB", "8192"))
+HEALTH_CHECK_AFTER_SECONDS = 30.0
+# With sharded storage there is one pool per shard file; idle pools beyond this many are closed.
+MAX_OPEN_POOLS = int(os.getenv("MYRITU_DB_MAX_POOLS", "256"))
+
+
+class PooledConnection:
+    # Thin proxy around a sqlite3 connection. Everything is delegated to the real
+    # connection, except close(), which hands it back to the pool instead, and cursors,
+    # which count statements and rows for the instrumentation spans when it is enabled.
+    def __init__(self, pool, raw_conn):
+        self._pool = pool
+        self._raw = raw_conn
+        self._depth = 0
+        self.last_used = time.monotonic()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    @property
+    def raw(self):
+        return self._raw
+
+    def cursor(self, factory=CURSOR_FACTORY):
+        return self._raw.cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        self._pool._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._raw.commit()
+            else:
+                self._raw.rollback()
+        finally:
+            self.close()
+        return False
+
+
+class ConnectionPool:
+    def __init__(self, database, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT_SECONDS):
+        self.database = database
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = []  # LIFO, so the warmest connection is reused first
+        self._open = 0
+        self._local = threading.local()
+        self._stats = {
+            "checkouts": 0, "reentrant_checkouts": 0, "created": 0, "discarded": 0,
+            "waits": 0, "wait_time_total": 0.0, "wait_time_max": 0.0, "timeouts": 0,
+        }
+
+    def _connect(self):
+        raw = sqlite3.connect(self.database, check_same_thread=False)
+        raw.row_factory = sqlite3.Row
+        # Applied once per physical connection, not per checkout. busy_timeout comes first so
+        # that switching a brand-new file (e.g. a shard) to WAL waits out a concurrent opener.
+        raw.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        raw.execute("PRAGMA journal_mode=WAL")
+        raw.execute("PRAGMA synchronous=NORMAL")
+        raw.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+        return PooledConnection(self, raw)
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            conn.raw.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.raw.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+
+    def connection(self):
+        # A thread that already holds a connection gets the same one back, so nested
+        # helpers (e.g. update_user_profile -> get_user_profile) never self-deadlock.
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            held._depth += 1
+            with self._cond:
+                self._stats["reentrant_checkouts"] += 1
+            return held
+
+        while True:
+            conn = self._acquire()
+            if conn is None:
+                conn = self._connect()
+            elif time.monotonic() - conn.last_used > HEALTH_CHECK_AFTER_SECONDS and not self._is_healthy(conn):
+                self._discard(conn)
+                continue
+            conn._depth = 1
+            self._local.conn = conn
+            return conn
+
+    def _acquire(self):
+        # Returns an idle connection, or None when the caller may open a new one.
+        with self._cond:
+            self._stats["checkouts"] += 1
+            if self._idle:
+                return self._idle.pop()
+            if self._open < self.max_size:
+                self._open += 1
+                self._stats["created"] += 1
+                return None
+
+            started = time.monotonic()
+            deadline = started + self.timeout
+            self._stats["waits"] += 1
+            while not self._idle and self._open >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise sqlite3.OperationalError(
+                        f"connection pool for {self.database} exhausted after {self.timeout}s")
+                self._cond.wait(remaining)
+            waited = time.monotonic() - started
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1
+            self._stats["created"] += 1
+            return None
+
+    def _release(self, conn):
+        if getattr(self._local, "conn", None) is not conn:
+            return  # already released by this thread
+        conn._depth -= 1
+        if conn._depth > 0:
+            return
+        self._local.conn = None
+        try:
+            if conn.raw.in_transaction:
+                conn.raw.rollback()  # never hand out a connection with a half-finished write
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        conn.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["open_connections"] = self._open
+            stats["idle_connections"] = len(self._idle)
+            stats["in_use_connections"] = self._open - len(self._idle)
+            stats["max_size"] = self.max_size
+            stats["wait_time_avg"] = stats["wait_time_total"] / stats["waits"] if stats["waits"] else 0.0
+        return stats
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn in idle:
+            try:
+                conn.raw.close()
+            except sqlite3.Error:
+                pass
+
+
+# --- Process-wide registry, one pool per database file ---
+_pools = OrderedDict()  # least recently used first
+_pools_lock = threading.Lock()
+
+def get_pool(database, max_size=None):
+    evicted = []
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is not None:
+            _pools.move_to_end(database)
+            return pool
+        pool = ConnectionPool(database, POOL_MAX_SIZE if max_size is None else max_size)
+        _pools[database] = pool
+        if len(_pools) > MAX_OPEN_POOLS:
+            # Only pools with nothing checked out; a busy one stays even if it is the oldest.
+            for name, candidate in list(_pools.items())[:-1]:
+                if len(_pools) <= MAX_OPEN_POOLS:
+                    break
+                if candidate.stats()["in_use_connections"] == 0:
+                    evicted.append(_pools.pop(name))
+    for candidate in evicted:
+        candidate.close_all()
+    return pool
+
+def close_pool(database):
+    # Closes the idle connections to one file and forgets its pool (e.g. before deleting the file).
+    with _pools_lock:
+        pool = _pools.pop(database, None)
+    if pool is not None:
+        pool.close_all()
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
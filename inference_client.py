@@ -0,0 +1,296 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- Client settings (overridable through the environment) ---
+CONNECT_TIMEOUT_SECONDS = float(os.getenv("MYRITU_CHAT_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT_SECONDS = float(os.getenv("MYRITU_CHAT_READ_TIMEOUT", "90"))
+MAX_RETRIES = int(os.getenv("MYRITU_CHAT_MAX_RETRIES", "3"))
+BACKOFF_BASE_SECONDS = float(os.getenv("MYRITU_CHAT_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX_SECONDS = float(os.getenv("MYRITU_CHAT_BACKOFF_MAX", "8"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("MYRITU_CHAT_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("MYRITU_CHAT_BREAKER_RESET", "30"))
+HTTP_POOL_SIZE = int(os.getenv("MYRITU_CHAT_HTTP_POOL_SIZE", "10"))
+
+RETRY_STATUS_CODES = (429, 503)
+
+
+class CircuitOpenError(Exception):
+    # Raised without touching the network while the endpoint is considered down.
+    pass
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self):
+        # Closed: always. Open: never, until reset_seconds have passed; then a single probe
+        # request is let through (half-open) and its outcome decides the next state.
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class InferenceMetrics:
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._first_token_latencies = deque(maxlen=window)
+        self._tokens_per_second = deque(maxlen=window)  # streamed replies only
+        self.counters = {"requests": 0, "successes": 0, "failures": 0, "retries": 0, "circuit_rejections": 0}
+        self.errors = {}  # error kind (HTTP status, "timeout", "connection", ...) -> count
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_error(self, kind):
+        with self._lock:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def record_latency(self, seconds, time_to_first_token=None, tokens_per_second=None):
+        with self._lock:
+            self._latencies.append(seconds)
+            if time_to_first_token is not None:
+                self._first_token_latencies.append(time_to_first_token)
+            if tokens_per_second is not None:
+                self._tokens_per_second.append(tokens_per_second)
+
+    def record_stream(self, measured):
+        # A finished streamed reply, as measured by measure_stream().
+        self.incr("tokens", measured["tokens"])
+        self.record_latency(measured["total_time"], measured["time_to_first_token"], measured["tokens_per_second"])
+
+    @staticmethod
+    def _percentiles(values):
+        if not values:
+            return {"p50": None, "p95": None, "max": None}
+        ordered = sorted(values)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+        return {"p50": pick(0.50), "p95": pick(0.95), "max": ordered[-1]}
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                **self.counters,
+                "errors": dict(self.errors),
+                "latency_seconds": self._percentiles(self._latencies),
+                "time_to_first_token_seconds": self._percentiles(self._first_token_latencies),
+                "tokens_per_second": self._percentiles(self._tokens_per_second),
+            }
+
+
+def measure_stream(started, first_token_at, finished, token_count):
+    # Time to first token and generation throughput of one streamed reply (perf_counter times).
+    generation_time = finished - (first_token_at or finished)
+    return {
+        "time_to_first_token": (first_token_at - started) if first_token_at else None,
+        "total_time": finished - started,
+        "tokens": token_count,
+        "tokens_per_second": (token_count - 1) / generation_time if token_count > 1 and generation_time > 0 else None,
+    }
+
+def _error_kind(exc):
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        return str(exc.response.status_code)
+    if isinstance(exc, requests.exceptions.Timeout):
+        return "timeout"
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        return "connection"
+    return type(exc).__name__
+
+
+class InferenceClient:
+    # One persistent, pooled HTTP session per endpoint, with timeouts, jittered
+    # exponential backoff on 429/503 and a circuit breaker in front of the network.
+    def __init__(self, api_url, api_token, connect_timeout=CONNECT_TIMEOUT_SECONDS,
+                 read_timeout=READ_TIMEOUT_SECONDS, max_retries=MAX_RETRIES, pool_size=HTTP_POOL_SIZE,
+                 breaker=None):
+        self.api_url = api_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = InferenceMetrics()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {api_token}"})
+
+    def _backoff_seconds(self, attempt, response=None):
+        delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), BACKOFF_MAX_SECONDS))
+            except ValueError:
+                pass
+        return delay
+
+    def _post(self, payload, stream=False):
+        if not self.breaker.allow_request():
+            self.metrics.incr("circuit_rejections")
+            raise CircuitOpenError("Inference endpoint is unavailable; failing fast.")
+        self.metrics.incr("requests")
+        headers = {"Accept": "text/event-stream"} if stream else None
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(self.api_url, json=payload, params={"wait_for_model": True},
+                                             headers=headers, timeout=self.timeout, stream=stream)
+            except requests.exceptions.ConnectionError as e:
+                # Covers refused/reset connections and connect timeouts; safe to retry.
+                if attempt < self.max_retries:
+                    self.metrics.incr("retries")
+                    time.sleep(self._backoff_seconds(attempt))
+                    attempt += 1
+                    continue
+                self._record_failure(e)
+                raise
+            except requests.exceptions.RequestException as e:
+                self._record_failure(e)
+                raise
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                self.metrics.incr("retries")
+                delay = self._backoff_seconds(attempt, response)
+                response.close()
+                time.sleep(delay)
+                attempt += 1
+                continue
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                response.close()
+                # Client errors (bad token, bad payload) say nothing about endpoint health.
+                if response.status_code >= 500 or response.status_code == 429:
+                    self._record_failure(e)
+                else:
+                    self.breaker.record_success()
+                    self.metrics.incr("failures")
+                    self.metrics.record_error(_error_kind(e))
+                raise
+            return response
+
+    def _record_failure(self, exc):
+        self.breaker.record_failure()
+        self.metrics.incr("failures")
+        self.metrics.record_error(_error_kind(exc))
+
+    def generate(self, payload):
+        started = time.perf_counter()
+        response = self._post(payload)
+        try:
+            result = response.json()
+        except ValueError as e:
+            self._record_failure(e)
+            raise
+        finally:
+            response.close()
+        self.breaker.record_success()
+        self.metrics.incr("successes")
+        self.metrics.record_latency(time.perf_counter() - started)
+        return result
+
+    def stream(self, payload, stream_stats=None):
+        # Yields generated text piece by piece from the endpoint's server-sent event stream.
+        # If stream_stats (a dict) is given it is filled with time-to-first-token and throughput.
+        started = time.perf_counter()
+        token_count = 0
+        first_token_at = None
+        response = self._post(dict(payload, stream=True), stream=True)
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                if event.get("error"):
+                    raise RuntimeError(f"Inference stream error: {event['error']}")
+                token = event.get("token") or {}
+                if token.get("special") or not token.get("text"):
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                token_count += 1
+                yield token["text"]
+        except GeneratorExit:
+            # The caller stopped reading early; the endpoint itself was healthy.
+            self.breaker.record_success()
+            raise
+        except Exception as e:
+            self._record_failure(e)
+            raise
+        finally:
+            response.close()
+        self.breaker.record_success()
+        self.metrics.incr("successes")
+        measured = measure_stream(started, first_token_at, time.perf_counter(), token_count)
+        self.metrics.record_stream(measured)
+        if stream_stats is not None:
+            stream_stats.update(measured)
+
+
+# --- Process-wide clients, shared by every session ---
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_inference_client(api_url, api_token):
+    key = (api_url, api_token)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = InferenceClient(api_url, api_token)
+                _clients[key] = client
+    return client
+
+def get_inference_metrics():
+    with _clients_lock:
+        clients = list(_clients.values())
+    return {client.api_url: dict(client.metrics.snapshot(), circuit_state=client.breaker.state) for client in clients}
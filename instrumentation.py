@@ -0,0 +1,294 @@
+import atexit
+import functools
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-rerun timing for the hot paths.
+#
+# Functions decorated with @timed (and blocks wrapped in `with span(...)`) are recorded as
+# a tree of spans for the current Streamlit rerun: start_rerun() at the top of main.py
+# opens the root, finish_rerun() at the bottom closes it and returns the tree. Every
+# SQLite statement and fetched row is attributed to the innermost open span through the
+# cursor class the connection pool hands out (CURSOR_FACTORY: CountingCursor when enabled).
+#
+# Independently of the tree, every span's duration feeds a per-name latency histogram,
+# written in Prometheus text format to MYRITU_METRICS_FILE (e.g. for node_exporter's
+# textfile collector) at most every MYRITU_METRICS_INTERVAL seconds.
+
+DEBUG_PANEL_ENABLED = os.getenv("MYRITU_DEBUG_PANEL", "0") == "1"  # per-rerun span tree in the UI
+METRICS_FILE = os.getenv("MYRITU_METRICS_FILE")
+# Off by default: spans and per-statement counting cost something on every rerun and query.
+# The debug panel and the metrics file need it, so either one turns it on.
+INSTRUMENTATION_ENABLED = os.getenv("MYRITU_INSTRUMENTATION", "0") == "1" or DEBUG_PANEL_ENABLED or bool(METRICS_FILE)
+METRICS_INTERVAL_SECONDS = float(os.getenv("MYRITU_METRICS_INTERVAL", "15"))
+HISTOGRAM_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Span:
+    __slots__ = ("name", "started", "duration", "queries", "rows", "db_time", "children", "error")
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration = None
+        self.queries = 0  # statements run while this was the innermost span
+        self.rows = 0
+        self.db_time = 0.0
+        self.children = []
+        self.error = None
+
+    def total(self, attr):
+        # Own count plus every descendant's.
+        return getattr(self, attr) + sum(child.total(attr) for child in self.children)
+
+    def to_dict(self):
+        return {
+            "name": self.name, "duration_ms": 1000 * (self.duration or 0.0), "queries": self.queries,
+            "rows": self.rows, "db_ms": 1000 * self.db_time, "error": self.error,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+_local = threading.local()  # .stack: open spans of this thread, outermost first
+
+def _current_span():
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+# --- Latency histograms, process-wide ---
+_histograms = {}  # span name -> [bucket counts..., +Inf count], sum, queries, rows
+_histograms_lock = threading.Lock()
+_last_metrics_write = 0.0
+
+def _observe(span):
+    with _histograms_lock:
+        entry = _histograms.get(span.name)
+        if entry is None:
+            entry = _histograms[span.name] = {"buckets": [0] * (len(HISTOGRAM_BUCKETS) + 1), "sum": 0.0,
+                                              "queries": 0, "rows": 0, "errors": 0}
+        for index, bound in enumerate(HISTOGRAM_BUCKETS):
+            if span.duration <= bound:
+                entry["buckets"][index] += 1
+                break
+        else:
+            entry["buckets"][-1] += 1
+        entry["sum"] += span.duration
+        entry["queries"] += span.queries
+        entry["rows"] += span.rows
+        if span.error:
+            entry["errors"] += 1
+
+
+@contextmanager
+def span(name):
+    if not INSTRUMENTATION_ENABLED:
+        yield None
+        return
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    current = Span(name)
+    if stack:
+        stack[-1].children.append(current)
+    stack.append(current)
+    try:
+        yield current
+    except BaseException as e:
+        # Streamlit's st.rerun()/st.stop() also arrive here; they are control flow, not failures.
+        if isinstance(e, Exception):
+            current.error = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.started
+        if stack and stack[-1] is current:
+            stack.pop()
+        _observe(current)
+
+def timed(func=None, *, name=None):
+    # @timed or @timed(name="..."); the span is named after the function by default,
+    # e.g. "db.get_Ritu_history".
+    def decorate(func):
+        if not INSTRUMENTATION_ENABLED:
+            return func  # no wrapper at all when disabled
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate(func) if func is not None else decorate
+
+
+def start_rerun(name="rerun"):
+    # Opens the root span for this script run; a previous run that was cut short
+    # (st.rerun() raises out of the script) is dropped.
+    _local.stack = []
+    if not INSTRUMENTATION_ENABLED:
+        return None
+    root = Span(name)
+    _local.stack.append(root)
+    return root
+
+def finish_rerun():
+    # Closes the root span and returns it (None when no rerun was started).
+    stack = getattr(_local, "stack", None)
+    if not stack:
+        return None
+    root = stack[0]
+    _local.stack = []
+    root.duration = time.perf_counter() - root.started
+    _observe(root)
+    maybe_write_metrics()
+    return root
+
+
+# --- SQLite accounting ---
+class CountingCursor(sqlite3.Cursor):
+    # Attributes statements, fetched rows and time spent in SQLite to the innermost open span.
+    def execute(self, sql, parameters=()):
+        current = _current_span()
+        if current is None:
+            return super().execute(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            current.queries += 1
+            current.db_time += time.perf_counter() - started
+
+    def executemany(self, sql, seq_of_parameters):
+        current = _current_span()
+        if current is None:
+            return super().executemany(sql, seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            current.queries += 1
+            current.db_time += time.perf_counter() - started
+
+    def _fetched(self, rows, started):
+        current = _current_span()
+        if current is not None:
+            current.rows += rows
+            current.db_time += time.perf_counter() - started
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(row is not None, started)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(len(rows), started)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(len(rows), started)
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        current = _current_span()
+        if current is not None:
+            current.rows += 1
+        return row
+
+
+# What the connection pool's cursors are made of: plain sqlite3 cursors unless enabled.
+CURSOR_FACTORY = CountingCursor if INSTRUMENTATION_ENABLED else sqlite3.Cursor
+
+
+# --- Output ---
+def format_span_tree(root, min_ms=0.0):
+    # One line per span: duration, own/total queries and rows, indented by depth.
+    lines = []
+
+    def walk(node, depth):
+        duration_ms = 1000 * (node.duration or 0.0)
+        if depth and duration_ms < min_ms:
+            return
+        queries, rows = node.total("queries"), node.total("rows")
+        db_ms = 1000 * node.total("db_time")
+        error = f"  !{node.error}" if node.error else ""
+        lines.append(f"{'  ' * depth}{node.name}  {duration_ms:.1f} ms  "
+                     f"[{queries} queries, {rows} rows, {db_ms:.1f} ms sqlite]{error}")
+        for child in node.children:
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines)
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def render_prometheus():
+    with _histograms_lock:
+        snapshot = {name: {"buckets": list(entry["buckets"]), "sum": entry["sum"], "queries": entry["queries"],
+                           "rows": entry["rows"], "errors": entry["errors"]}
+                    for name, entry in _histograms.items()}
+    lines = [
+        "# HELP myritu_span_duration_seconds Time spent in instrumented MyRitu functions and reruns.",
+        "# TYPE myritu_span_duration_seconds histogram",
+    ]
+    for name in sorted(snapshot):
+        entry, label = snapshot[name], _label(name)
+        cumulative = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS, entry["buckets"]):
+            cumulative += count
+            lines.append(f'myritu_span_duration_seconds_bucket{{span="{label}",le="{bound}"}} {cumulative}')
+        cumulative += entry["buckets"][-1]
+        lines.append(f'myritu_span_duration_seconds_bucket{{span="{label}",le="+Inf"}} {cumulative}')
+        lines.append(f'myritu_span_duration_seconds_sum{{span="{label}"}} {entry["sum"]:.6f}')
+        lines.append(f'myritu_span_duration_seconds_count{{span="{label}"}} {cumulative}')
+    for metric, key, help_text in (
+        ("myritu_span_db_queries_total", "queries", "SQLite statements run directly inside a span."),
+        ("myritu_span_db_rows_total", "rows", "SQLite rows fetched directly inside a span."),
+        ("myritu_span_errors_total", "errors", "Spans that ended with an exception."),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for name in sorted(snapshot):
+            lines.append(f'{metric}{{span="{_label(name)}"}} {snapshot[name][key]}')
+    return "\n".join(lines) + "\n"
+
+def write_metrics(path=None):
+    # Written to a temporary file and renamed, so a scraper never reads half a file.
+    path = path or METRICS_FILE
+    if not path:
+        return False
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(render_prometheus())
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        print(f"Error writing metrics to {path}: {e}")
+        return False
+
+def maybe_write_metrics():
+    global _last_metrics_write
+    if not METRICS_FILE:
+        return False
+    now = time.monotonic()
+    if now - _last_metrics_write < METRICS_INTERVAL_SECONDS:
+        return False
+    _last_metrics_write = now
+    return write_metrics()
+
+if METRICS_FILE:
+    atexit.register(write_metrics)
+
+def reset_metrics():
+    with _histograms_lock:
+        _histograms.clear()
@@ -1,22 +1,47 @@
+import importlib
+import io
 import streamlit as st
 from datetime import datetime
-from PIL import Image
 from auth import signup_user, login_user, logout_user, get_user_profile, update_user_profile
-from db import init_db, delete_user_data, log_chat_message, get_chat_history_from_db
-from streamlit_option_menu import option_menu
+from db import init_db, delete_user_data, user_exists, log_chat_message, get_chat_history_from_db, get_db_pool_stats, get_chat_log_writer_stats
+from instrumentation import DEBUG_PANEL_ENABLED, start_rerun, finish_rerun, format_span_tree, span
+from ritu_io import detect_format, import_Ritu_history, iter_export_chunks
 
-# Import tab functions
-from tabs.tab_home import show_home_tab
-from tabs.tab_calendar import show_calendar_tab
-from tabs.tab_hormones import show_hormones_tab
-from tabs.tab_insights import show_insights_tab
-from tabs.tab_chat import show_chat_tab
+# Tab renderers, imported on first use: the tabs pull in pandas, Plotly, streamlit_calendar
+# and the inference client, which the login page never needs.
+TAB_RENDERERS = {
+    "app_home": ("tabs.tab_home", "show_home_tab"),
+    "app_calendar": ("tabs.tab_calendar", "show_calendar_tab"),
+    "app_hormones": ("tabs.tab_hormones", "show_hormones_tab"),
+    "app_insights": ("tabs.tab_insights", "show_insights_tab"),
+    "app_rituchat": ("tabs.tab_chat", "show_chat_tab"),
+}
+
+def get_tab_renderer(view):
+    module_name, function_name = TAB_RENDERERS[view]
+    # importlib returns the sys.modules entry after the first call, so this is a dict lookup on later reruns.
+    with span(f"import.{module_name}"):
+        module = importlib.import_module(module_name)
+    return getattr(module, function_name)
+
+# Root of this rerun's span tree (see instrumentation.py); closed at the bottom of the script.
+start_rerun(f"rerun.{st.session_state.get('current_view', 'login')}")
 
 init_db()
 
 st.set_page_config(page_title="MyRitu", page_icon="🌸", layout="wide", initial_sidebar_state="collapsed")
 
 PINK_TEXT_COLOR = "#E57396"
+LOGO_PATH = "assets/logo.png"
+
+@st.cache_resource
+def load_logo(path=LOGO_PATH):
+    # Read once per process (None when the file is missing) instead of on every login-page rerun.
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
 
 # --- Session State Initialization ---
 if 'logged_in' not in st.session_state: st.session_state.logged_in = False
@@ -47,7 +72,9 @@ def show_settings_page_section(user_id, is_initial_setup=False):
     else: # Directly render form for initial setup
         render_profile_form(user_id, profile_data, is_initial_setup)
 
-    if not is_initial_setup: # Account actions only if not initial setup
+    if not is_initial_setup: # Data import/export and account actions only if not initial setup
+        render_data_section(user_id)
+
         st.subheader("🔒 Account Actions")
         if st.button("🚪 Log Out", key="settings_logout"):
             if 'chat_messages_display' in st.session_state:
@@ -71,6 +98,38 @@ def show_settings_page_section(user_id, is_initial_setup=False):
             st.session_state.current_view = "app_home"
             st.rerun()
 
+# --- Helper function to render the import/export section ---
+def _export_bytes(user_id, fmt):
+    buffer = io.BytesIO()
+    for piece in iter_export_chunks(user_id, fmt):
+        buffer.write(piece.encode("utf-8"))
+    return buffer.getvalue()
+
+def render_data_section(user_id):
+    st.subheader("📦 Your Data")
+    with st.expander("Import Ritu History"):
+        st.caption("CSV (one column per symptom, or a JSON `symptoms` column), a JSON array, or NDJSON. "
+                   "Each entry needs a `period_start_date` (YYYY-MM-DD); dates you've already logged are skipped.")
+        uploaded = st.file_uploader("History file", type=["csv", "json", "ndjson", "jsonl"], key="history_import_file")
+        if uploaded is not None and st.button("Import", key="history_import_btn"):
+            text = io.TextIOWrapper(uploaded, encoding="utf-8-sig", newline="")
+            with st.spinner("Importing..."):
+                success, message, summary = import_Ritu_history(user_id, text, detect_format(uploaded.name))
+            if success:
+                st.success(message)
+                for error in summary["errors"]:
+                    st.caption(error)
+                st.session_state.profile_info = get_user_profile(user_id)
+            else:
+                st.error(message)
+    with st.expander("Export Ritu History"):
+        export_format = st.selectbox("Format", ["csv", "json", "ndjson"], key="history_export_format")
+        # Deferred: the export is only generated when the button is clicked, and is handed
+        # straight to Streamlit rather than kept in session state.
+        st.download_button(f"Download {export_format.upper()}", lambda: _export_bytes(user_id, export_format),
+                           file_name=f"myritu_history.{export_format}",
+                           mime="text/csv" if export_format == "csv" else "application/json", key="history_export_download")
+
 # --- Helper function to render the profile form ---
 def render_profile_form(user_id, profile_data, is_initial_setup):
     with st.form("profile_form_main_settings"): # Unique key for the form
@@ -126,6 +185,15 @@ def render_profile_form(user_id, profile_data, is_initial_setup):
             else:
                 st.error(message)
 
+# --- Opt-in debug panel (MYRITU_DEBUG_PANEL=1): where this rerun's time went ---
+def render_debug_panel(rerun_span):
+    with st.expander(f"🛠️ Debug: this rerun took {1000 * rerun_span.duration:.0f} ms"):
+        st.code(format_span_tree(rerun_span), language=None)
+        st.caption(f"Connection pool: {get_db_pool_stats()}")
+        st.caption(f"Chat log writer: {get_chat_log_writer_stats()}")
+        from chat_backends import get_chat_backend_stats  # imported here to keep it off the login path
+        st.caption(f"Chat backend: {get_chat_backend_stats()}")
+
 # --- Initial Profile Setup Page ---
 def show_initial_profile_setup(user_id):
     # This function now correctly calls show_settings_page_section
@@ -138,10 +206,10 @@ if not st.session_state.logged_in:
     st.markdown("<br><br>", unsafe_allow_html=True)
     login_cols = st.columns([1, 1.5, 1])
     with login_cols[1]:
-        try:
-            logo = Image.open("assets/logo.png")
+        logo = load_logo()
+        if logo is not None:
             st.image(logo, width=150, use_column_width='auto')
-        except FileNotFoundError:
+        else:
             st.markdown(f"<h1 style='text-align: center; color: {PINK_TEXT_COLOR};'>MyRitu 🌸</h1>", unsafe_allow_html=True)
 
         st.markdown("<p style='text-align: center; font-size: 1.2em;'>Track your Ritu, understand your body.</p>", unsafe_allow_html=True)
@@ -196,12 +264,16 @@ if not st.session_state.logged_in:
                 st.session_state.current_view = "signup"
                 st.rerun()
 
+elif not user_exists(st.session_state.user_id):
+    # The account was deleted (e.g. from another session); nothing more is read or written for it.
+    logout_user()
 elif st.session_state.current_view == "initial_profile_setup": # This is the view that was causing the error
     show_initial_profile_setup(st.session_state.user_id)
 elif st.session_state.current_view == "settings":
     show_settings_page_section(st.session_state.user_id, is_initial_setup=False) # Explicitly False
 else: # Main app view (app_home, app_calendar, etc.)
     # --- Horizontal Navigation Menu ---
+    from streamlit_option_menu import option_menu  # only needed once logged in
     menu_options = ["🏠 Home", "🗓️ Calendar", "🧬 Hormones", "📊 Insights", "💬 RituChat", "⚙️ Settings"]
     icons = ['house', 'calendar3', 'heart-pulse', 'graph-up', 'chat-dots', 'gear-fill']
     
@@ -247,8 +319,10 @@ else: # Main app view (app_home, app_calendar, etc.)
 
     # --- Display content based on current_view ---
     # The settings view is handled by the main 'elif' block for st.session_state.current_view == "settings"
-    if st.session_state.current_view == "app_home": show_home_tab()
-    elif st.session_state.current_view == "app_calendar": show_calendar_tab()
-    elif st.session_state.current_view == "app_hormones": show_hormones_tab()
-    elif st.session_state.current_view == "app_insights": show_insights_tab()
-    elif st.session_state.current_view == "app_rituchat": show_chat_tab()
\ No newline at end of file
+    if st.session_state.current_view in TAB_RENDERERS:
+        get_tab_renderer(st.session_state.current_view)()
+
+# --- Close this rerun's span tree (not reached when the run ended in st.rerun()) ---
+rerun_span = finish_rerun()
+if DEBUG_PANEL_ENABLED and rerun_span is not None:
+    render_debug_panel(rerun_span)
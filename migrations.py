@@ -0,0 +1,242 @@
+import datetime
+
+from prediction import rebuild_Ritu_stats
+
+# Ordered schema migrations. Each step runs exactly once per database; the applied
+# version is recorded in the schema_version table. Append new steps to MIGRATIONS,
+# never edit or reorder steps that have already shipped.
+
+def _create_base_tables(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            email TEXT UNIQUE,
+            registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_profiles (
+            user_id INTEGER PRIMARY KEY,
+            full_name TEXT,
+            birth_date TEXT,
+            avg_Ritu_length INTEGER DEFAULT 28,
+            avg_period_length INTEGER DEFAULT 5,
+            last_period_start TEXT,
+            medical_conditions TEXT,
+            medications TEXT,
+            preferences TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Ritu_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            period_start_date TEXT NOT NULL,
+            period_end_date TEXT,
+            symptoms TEXT,
+            notes TEXT,
+            logged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sender TEXT NOT NULL, -- "user" or "bot"
+            message TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+def _add_life_stage_column(cursor):
+    # Databases created before life_stage existed need the column added.
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(user_profiles)").fetchall()]
+    if 'life_stage' not in columns:
+        cursor.execute("ALTER TABLE user_profiles ADD COLUMN life_stage TEXT")
+
+def _index_Ritu_data_by_user_start(cursor):
+    # Serves get_Ritu_history: WHERE user_id = ? ORDER BY period_start_date, no table scan or sort.
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_Ritu_data_user_start ON Ritu_data (user_id, period_start_date)"
+    )
+
+def _index_chat_logs_by_user_id(cursor):
+    # Serves get_chat_history_from_db: WHERE user_id = ? ORDER BY id DESC LIMIT ?
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_chat_logs_user_id ON chat_logs (user_id, id)"
+    )
+
+def _create_symptom_entries(cursor):
+    # One row per (period log, symptom name); numbers and booleans go to value_num,
+    # strings to value_text, so aggregates are plain GROUP BY / AVG queries.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS symptom_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            Ritu_data_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            period_start_date TEXT NOT NULL,
+            name TEXT NOT NULL,
+            value_text TEXT,
+            value_num REAL,
+            FOREIGN KEY (Ritu_data_id) REFERENCES Ritu_data (id)
+        )
+    ''')
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_symptom_entries_user_name "
+        "ON symptom_entries (user_id, name, period_start_date)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_symptom_entries_Ritu_data ON symptom_entries (Ritu_data_id)"
+    )
+
+def _backfill_symptom_entries(cursor):
+    # Decodes the existing JSON blobs inside SQLite (json_each), so no Python-side json.loads.
+    cursor.execute('''
+        INSERT INTO symptom_entries (Ritu_data_id, user_id, period_start_date, name, value_text, value_num)
+        SELECT r.id, r.user_id, r.period_start_date, j.key,
+               CASE WHEN j.type = 'text' THEN j.value END,
+               CASE WHEN j.type IN ('integer', 'real', 'true', 'false') THEN j.value END
+        FROM Ritu_data AS r, json_each(r.symptoms) AS j
+        WHERE r.symptoms IS NOT NULL AND json_valid(r.symptoms) AND json_type(r.symptoms) = 'object'
+          AND j.type NOT IN ('object', 'array')
+          AND NOT EXISTS (SELECT 1 FROM symptom_entries AS s WHERE s.Ritu_data_id = r.id)
+    ''')
+
+def _create_chat_response_cache(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_response_cache (
+            cache_key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL,
+            hit_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_chat_response_cache_last_used ON chat_response_cache (last_used_at)"
+    )
+
+def _create_chat_jobs(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_jobs (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            request_key TEXT UNIQUE NOT NULL,
+            status TEXT NOT NULL, -- "queued", "running", "done" or "failed"
+            result TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_jobs_user_status ON chat_jobs (user_id, status)")
+
+def _create_Ritu_stats(cursor):
+    # Running per-user Ritu length estimate maintained by prediction.update_Ritu_stats.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Ritu_stats (
+            user_id INTEGER PRIMARY KEY,
+            last_period_start TEXT,
+            Ritu_count INTEGER NOT NULL DEFAULT 0,
+            mean_Ritu_length REAL,
+            Ritu_length_var REAL NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    for (user_id,) in cursor.execute("SELECT DISTINCT user_id FROM Ritu_data").fetchall():
+        rebuild_Ritu_stats(cursor, user_id)
+
+def _create_user_predictions(cursor):
+    # Written by precompute.py (and by the Home tab when a row is stale).
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_predictions (
+            user_id INTEGER PRIMARY KEY,
+            next_period_start TEXT,
+            ovulation_date TEXT,
+            fertile_start TEXT,
+            fertile_end TEXT,
+            interval_start TEXT,
+            interval_end TEXT,
+            Ritu_length REAL,
+            Ritu_length_days INTEGER,
+            Ritus_used INTEGER NOT NULL DEFAULT 0,
+            source TEXT, -- "history" or "profile"
+            phase TEXT,
+            phase_date TEXT NOT NULL,
+            input_fingerprint TEXT NOT NULL,
+            computed_at TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+def _index_chat_jobs_by_updated_at(cursor):
+    # For pruning old jobs (chat_jobs.submit_chat_job).
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_jobs_updated_at ON chat_jobs (updated_at)")
+
+def _add_chat_response_cache_user_id(cursor):
+    # Entries are per user, so they can be purged with the account.
+    cursor.execute("ALTER TABLE chat_response_cache ADD COLUMN user_id INTEGER")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_response_cache_user_id ON chat_response_cache (user_id)")
+
+MIGRATIONS = [
+    (1, "Create users, user_profiles, Ritu_data and chat_logs tables", _create_base_tables),
+    (2, "Add user_profiles.life_stage", _add_life_stage_column),
+    (3, "Index Ritu_data (user_id, period_start_date)", _index_Ritu_data_by_user_start),
+    (4, "Index chat_logs (user_id, id)", _index_chat_logs_by_user_id),
+    (5, "Create symptom_entries", _create_symptom_entries),
+    (6, "Backfill symptom_entries from Ritu_data.symptoms", _backfill_symptom_entries),
+    (7, "Create chat_response_cache", _create_chat_response_cache),
+    (8, "Create chat_jobs", _create_chat_jobs),
+    (9, "Create and backfill Ritu_stats", _create_Ritu_stats),
+    (10, "Create user_predictions", _create_user_predictions),
+    (11, "Index chat_jobs (updated_at)", _index_chat_jobs_by_updated_at),
+    (12, "Add chat_response_cache.user_id", _add_chat_response_cache_user_id),
+]
+
+
+def _ensure_version_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    ''')
+
+def get_schema_version(conn):
+    _ensure_version_table(conn)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+def run_migrations(conn, migrations=None):
+    # Applies every pending step in order, each in its own IMMEDIATE transaction so that
+    # two processes starting at once cannot both apply the same step.
+    migrations = MIGRATIONS if migrations is None else migrations
+    applied = []
+    if get_schema_version(conn) >= migrations[-1][0]:
+        return applied
+    for version, description, step in migrations:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+            if version <= current:
+                conn.rollback()
+                continue
+            step(conn.cursor())
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.datetime.now().isoformat(timespec='seconds'))
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
@@ -0,0 +1,206 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import date, datetime
+
+from db import connect_database, get_user_db_connection, iter_user_databases
+from instrumentation import timed
+from prediction import predict_next_period
+from utils import get_Ritu_phase
+
+# Nightly batch job: materializes every user's next-period prediction and today's phase
+# into user_predictions, so the Home tab reads one row instead of computing them.
+#
+#   python precompute.py --workers 8 --chunk-size 1000
+#
+# Users are read in keyset-paginated chunks (database by database when storage is sharded),
+# computed on a process pool and written back by this (single) process, so SQLite only
+# ever sees one writer.
+
+PRECOMPUTE_CHUNK_SIZE = 1000
+
+_INPUT_QUERY = """
+    SELECT p.user_id, p.last_period_start, p.avg_Ritu_length, p.avg_period_length,
+           s.last_period_start AS stats_last_period_start, s.Ritu_count, s.mean_Ritu_length, s.Ritu_length_var
+    FROM user_profiles AS p LEFT JOIN Ritu_stats AS s ON s.user_id = p.user_id
+"""
+
+_PREDICTION_COLUMNS = (
+    "user_id", "next_period_start", "ovulation_date", "fertile_start", "fertile_end", "interval_start",
+    "interval_end", "Ritu_length", "Ritu_length_days", "Ritus_used", "source", "phase", "phase_date",
+    "input_fingerprint", "computed_at",
+)
+
+def input_fingerprint(profile, stats):
+    # Identifies the inputs a stored row was computed from; any profile edit or new log changes it.
+    stats = stats or {}
+    material = [profile.get('last_period_start'), profile.get('avg_Ritu_length'), profile.get('avg_period_length'),
+                stats.get('last_period_start'), stats.get('Ritu_count'), stats.get('mean_Ritu_length'),
+                stats.get('Ritu_length_var')]
+    return hashlib.sha1(json.dumps(material, default=str).encode('utf-8')).hexdigest()
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+def compute_prediction_row(user_id, profile, stats, today):
+    # The values the Home tab shows, as stored in user_predictions (dates as 'YYYY-MM-DD').
+    prediction = predict_next_period(stats, profile.get('last_period_start'), profile.get('avg_Ritu_length'))
+    Ritu_length_days = prediction['Ritu_length_days'] if prediction else profile.get('avg_Ritu_length')
+    # The phase counts from the same start as the predicted dates: the later of the profile's
+    # and the logged history's.
+    last_start = _iso(prediction['last_period_start']) if prediction else profile.get('last_period_start')
+    interval = prediction['interval'] if prediction else None
+    return {
+        "user_id": user_id,
+        "next_period_start": _iso(prediction['next_period_start']) if prediction else None,
+        "ovulation_date": _iso(prediction['ovulation']) if prediction else None,
+        "fertile_start": _iso(prediction['fertile_window'][0]) if prediction else None,
+        "fertile_end": _iso(prediction['fertile_window'][1]) if prediction else None,
+        "interval_start": _iso(interval[0]) if interval else None,
+        "interval_end": _iso(interval[1]) if interval else None,
+        "Ritu_length": prediction['Ritu_length'] if prediction else None,
+        "Ritu_length_days": Ritu_length_days,
+        "Ritus_used": prediction['Ritus_used'] if prediction else 0,
+        "source": prediction['source'] if prediction else None,
+        "phase": get_Ritu_phase(today, last_start, profile.get('avg_period_length'), Ritu_length_days),
+        "phase_date": today.isoformat(),
+        "input_fingerprint": input_fingerprint(profile, stats),
+        "computed_at": datetime.now().isoformat(timespec='seconds'),
+    }
+
+def _compute_chunk(rows, today_iso):
+    # Runs in a worker process: rows are plain tuples from _INPUT_QUERY.
+    today = date.fromisoformat(today_iso)
+    results = []
+    for user_id, last_start, avg_Ritu, avg_period, stats_last, count, mean, var in rows:
+        profile = {'last_period_start': last_start, 'avg_Ritu_length': avg_Ritu, 'avg_period_length': avg_period}
+        stats = None
+        if stats_last is not None or count is not None:
+            stats = {'last_period_start': stats_last, 'Ritu_count': count, 'mean_Ritu_length': mean, 'Ritu_length_var': var}
+        row = compute_prediction_row(user_id, profile, stats, today)
+        results.append(tuple(row[column] for column in _PREDICTION_COLUMNS))
+    return results
+
+def _upsert_rows(conn, rows):
+    placeholders = ", ".join("?" for _ in _PREDICTION_COLUMNS)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO user_predictions ({', '.join(_PREDICTION_COLUMNS)}) VALUES ({placeholders})",
+        rows
+    )
+    conn.commit()
+
+def store_prediction_row(row):
+    conn = get_user_db_connection(row['user_id'])
+    try:
+        _upsert_rows(conn, [tuple(row[column] for column in _PREDICTION_COLUMNS)])
+    except sqlite3.Error as e:
+        print(f"Error storing prediction for user {row['user_id']}: {e}")
+    finally:
+        conn.close()
+
+@timed
+def get_home_prediction(user_id, profile, stats, today=None):
+    # The stored row when it was computed today from the same inputs; otherwise computed
+    # live (and stored, so the next visit today is a single read).
+    today = today or date.today()
+    fingerprint = input_fingerprint(profile, stats)
+    conn = get_user_db_connection(user_id)
+    try:
+        row = conn.execute("SELECT * FROM user_predictions WHERE user_id = ?", (user_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is not None and row['phase_date'] == today.isoformat() and row['input_fingerprint'] == fingerprint:
+        return dict(row)
+    row = compute_prediction_row(user_id, profile, stats, today)
+    store_prediction_row(row)
+    return row
+
+def _iter_input_chunks(database, chunk_size):
+    last_user_id = 0
+    while True:
+        conn = connect_database(database)
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            rows = cursor.execute(_INPUT_QUERY + " WHERE p.user_id > ? ORDER BY p.user_id LIMIT ?",
+                                  (last_user_id, chunk_size)).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return
+        yield rows
+        last_user_id = rows[-1][0]
+
+def _iter_all_input_chunks(chunk_size):
+    for database in iter_user_databases():
+        for rows in _iter_input_chunks(database, chunk_size):
+            yield database, rows
+
+def precompute_all(workers=None, chunk_size=PRECOMPUTE_CHUNK_SIZE, today=None, progress=None):
+    # Returns the number of users written. workers=0 computes in this process.
+    today_iso = (today or date.today()).isoformat()
+    total = 0
+    for database in iter_user_databases():
+        conn = connect_database(database)
+        try:
+            total += conn.execute("SELECT COUNT(*) FROM user_profiles").fetchone()[0]
+        finally:
+            conn.close()
+    done = 0
+    started = time.perf_counter()
+
+    def write(database, results):
+        nonlocal done
+        write_conn = connect_database(database)
+        try:
+            _upsert_rows(write_conn, results)
+        finally:
+            write_conn.close()
+        done += len(results)
+        if progress:
+            progress(done, total, time.perf_counter() - started)
+
+    if workers == 0:
+        for database, rows in _iter_all_input_chunks(chunk_size):
+            write(database, _compute_chunk(rows, today_iso))
+        return done
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}  # future -> database its rows came from
+        for database, rows in _iter_all_input_chunks(chunk_size):
+            pending[pool.submit(_compute_chunk, rows, today_iso)] = database
+            # Bound the chunks in flight so memory stays flat however many users there are.
+            if len(pending) >= workers * 2:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    write(pending.pop(future), future.result())
+        for future, database in pending.items():
+            write(database, future.result())
+    return done
+
+def _print_progress(done, total, elapsed):
+    rate = done / elapsed if elapsed else 0.0
+    print(f"  {done}/{total} users ({100.0 * done / max(total, 1):.0f}%), {rate:.0f} users/s", flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute next-period predictions and today's phase for all users")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (0 = run inline)")
+    parser.add_argument("--chunk-size", type=int, default=PRECOMPUTE_CHUNK_SIZE, help="users per chunk")
+    parser.add_argument("--date", help="compute phases for this date (YYYY-MM-DD) instead of today")
+    parser.add_argument("--quiet", action="store_true", help="no progress output")
+    args = parser.parse_args(argv)
+
+    today = date.fromisoformat(args.date) if args.date else None
+    started = time.perf_counter()
+    done = precompute_all(args.workers, args.chunk_size, today, None if args.quiet else _print_progress)
+    print(f"Precomputed predictions for {done} users in {time.perf_counter() - started:.1f}s.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
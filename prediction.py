@@ -0,0 +1,132 @@
+import math
+import os
+from datetime import date, datetime, timedelta
+
+# Next-period prediction from logged Ritu lengths.
+#
+# Each user's Ritu lengths (gaps between consecutive logged period starts) feed an
+# exponentially weighted mean and variance, so recent Ritus count more than old ones.
+# Gaps that cannot be a single Ritu (a double-logged period, months without logs) are
+# ignored, and once a few Ritus are known each new length is clipped to within
+# PREDICTION_CLIP_SIGMAS standard deviations of the current estimate before it is
+# folded in, so one unusual Ritu cannot swing the prediction.
+#
+# The running state lives in the Ritu_stats table and is advanced by one step per logged
+# period (see update_Ritu_stats), so predicting is a single-row read.
+
+PREDICTION_ALPHA = float(os.getenv("MYRITU_PREDICTION_ALPHA", "0.3"))  # weight of the newest Ritu
+PREDICTION_CLIP_SIGMAS = float(os.getenv("MYRITU_PREDICTION_CLIP_SIGMAS", "2.0"))
+PREDICTION_MIN_RITUS = 2  # fewer logged Ritus than this: fall back to the profile average
+MIN_RITU_DAYS, MAX_RITU_DAYS = 15, 90
+MIN_RITUS_FOR_CLIPPING = 3
+MIN_SD_DAYS = 1.0  # floor for the spread used in clipping and intervals
+CONFIDENCE_Z = 1.645  # two-sided 90% interval
+
+
+def _as_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+def empty_state(last_period_start=None):
+    return {"last_period_start": last_period_start, "Ritu_count": 0, "mean_Ritu_length": None, "Ritu_length_var": 0.0}
+
+def add_period_start(state, period_start):
+    # Advances the running state by one logged period start (which must be later than
+    # state["last_period_start"]) and returns the new state.
+    period_start = _as_date(period_start)
+    last = _as_date(state["last_period_start"])
+    state = dict(state, last_period_start=period_start)
+    if last is None:
+        return state
+    gap = (period_start - last).days
+    if not MIN_RITU_DAYS <= gap <= MAX_RITU_DAYS:
+        return state
+    count, mean, var = state["Ritu_count"], state["mean_Ritu_length"], state["Ritu_length_var"]
+    if count == 0:
+        return dict(state, Ritu_count=1, mean_Ritu_length=float(gap), Ritu_length_var=0.0)
+    x = float(gap)
+    if count >= MIN_RITUS_FOR_CLIPPING:
+        bound = PREDICTION_CLIP_SIGMAS * max(math.sqrt(var), MIN_SD_DAYS)
+        x = min(max(x, mean - bound), mean + bound)
+    # Exponentially weighted mean and variance (West's incremental form).
+    diff = x - mean
+    increment = PREDICTION_ALPHA * diff
+    mean += increment
+    var = (1 - PREDICTION_ALPHA) * (var + diff * increment)
+    return dict(state, Ritu_count=count + 1, mean_Ritu_length=mean, Ritu_length_var=var)
+
+def replay_period_starts(period_starts):
+    # Full recomputation from every logged start; used after out-of-order logs and imports.
+    state = empty_state()
+    for period_start in sorted({_as_date(value) for value in period_starts if value}):
+        state = add_period_start(state, period_start)
+    return state
+
+def _write_state(cursor, user_id, state):
+    last = state["last_period_start"]
+    cursor.execute(
+        """INSERT OR REPLACE INTO Ritu_stats
+           (user_id, last_period_start, Ritu_count, mean_Ritu_length, Ritu_length_var, updated_at)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        (user_id, last.isoformat() if last else None, state["Ritu_count"], state["mean_Ritu_length"],
+         state["Ritu_length_var"], datetime.now().isoformat(timespec='seconds'))
+    )
+    return state
+
+def rebuild_Ritu_stats(cursor, user_id):
+    cursor.execute("SELECT period_start_date FROM Ritu_data WHERE user_id = ?", (user_id,))
+    return _write_state(cursor, user_id, replay_period_starts(row[0] for row in cursor.fetchall()))
+
+def update_Ritu_stats(cursor, user_id, period_start):
+    # Called in the same transaction as the Ritu_data insert. A start after the last known
+    # one is a single O(1) step; anything else (first log, back-filled or repeated date)
+    # replays the user's history.
+    cursor.execute(
+        "SELECT last_period_start, Ritu_count, mean_Ritu_length, Ritu_length_var FROM Ritu_stats WHERE user_id = ?",
+        (user_id,)
+    )
+    row = cursor.fetchone()
+    period_start = _as_date(period_start)
+    if row is None or row[0] is None or period_start <= _as_date(row[0]):
+        return rebuild_Ritu_stats(cursor, user_id)
+    state = {"last_period_start": row[0], "Ritu_count": row[1], "mean_Ritu_length": row[2], "Ritu_length_var": row[3]}
+    return _write_state(cursor, user_id, add_period_start(state, period_start))
+
+def predict_next_period(stats, last_period_start=None, fallback_Ritu_length=None):
+    # Returns None when there is nothing to predict from, else a dict with the predicted
+    # next start, ovulation day and fertile window (dates, same offsets as
+    # utils.calculate_next_period), the Ritu length used, a 90% interval for the next
+    # start (None when based on the profile average alone) and where the length came from.
+    stats = stats or empty_state()
+    last = max(filter(None, [_as_date(stats.get("last_period_start")), _as_date(last_period_start)]), default=None)
+    if last is None:
+        return None
+    count = stats.get("Ritu_count") or 0
+    interval = None
+    if count >= PREDICTION_MIN_RITUS:
+        Ritu_length = stats["mean_Ritu_length"]
+        spread = max(math.sqrt(stats["Ritu_length_var"] or 0.0), MIN_SD_DAYS) * math.sqrt(1 + 1 / count)
+        half_width = math.ceil(CONFIDENCE_Z * spread)
+        source = "history"
+    elif fallback_Ritu_length:
+        Ritu_length = float(fallback_Ritu_length)
+        source = "profile"
+    else:
+        return None
+    length_days = max(1, int(round(Ritu_length)))
+    next_start = last + timedelta(days=length_days)
+    ovulation = next_start - timedelta(days=14)
+    if source == "history":
+        interval = (next_start - timedelta(days=half_width), next_start + timedelta(days=half_width))
+    return {
+        "last_period_start": last,
+        "next_period_start": next_start,
+        "ovulation": ovulation,
+        "fertile_window": (ovulation - timedelta(days=5), ovulation + timedelta(days=1)),
+        "Ritu_length": Ritu_length,
+        "Ritu_length_days": length_days,
+        "interval": interval,
+        "Ritus_used": count if source == "history" else 0,
+        "source": source,
+    }
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from db import get_db_connection
+
+# Opt-in cache of finished chat replies, stored in SQLite so it survives restarts and is
+# shared by every session. Entries belong to one user: the key is the user, their normalized
+# question, a hash of their chat context (profile and history, as put into the prompt), the
+# model and its parameters. Rephrasings that only differ in case or punctuation hit, and any
+# change to the user's data misses. A user's entries are deleted with their account.
+RESPONSE_CACHE_ENABLED = os.getenv("MYRITU_RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("MYRITU_RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("MYRITU_RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+# Replies sampled hotter than this vary too much between runs to be worth reusing.
+RESPONSE_CACHE_MAX_TEMPERATURE = float(os.getenv("MYRITU_RESPONSE_CACHE_MAX_TEMPERATURE", "0.7"))
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "skipped": 0, "expired": 0}
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+def normalize_question(text):
+    text = re.sub(r"[^\w\s]", " ", (text or "").lower())
+    return " ".join(text.split())
+
+def is_cacheable(parameters):
+    if not RESPONSE_CACHE_ENABLED:
+        return False
+    if parameters.get("do_sample") and parameters.get("temperature", 1.0) > RESPONSE_CACHE_MAX_TEMPERATURE:
+        _count("skipped")
+        return False
+    return True
+
+def make_cache_key(user_id, question, context, model_id, parameters):
+    material = json.dumps({
+        "user": user_id,
+        "question": normalize_question(question),
+        "context": hashlib.sha256(context.encode("utf-8")).hexdigest(),
+        "model": model_id,
+        "parameters": parameters,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def get_cached_response(cache_key):
+    now = time.time()
+    conn = get_db_connection()
+    try:
+        row = conn.execute(
+            "SELECT response, created_at FROM chat_response_cache WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+        if row is None:
+            _count("misses")
+            return None
+        if now - row["created_at"] > RESPONSE_CACHE_TTL_SECONDS:
+            conn.execute("DELETE FROM chat_response_cache WHERE cache_key = ?", (cache_key,))
+            conn.commit()
+            _count("expired")
+            _count("misses")
+            return None
+        conn.execute(
+            "UPDATE chat_response_cache SET last_used_at = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+            (now, cache_key)
+        )
+        conn.commit()
+        _count("hits")
+        return row["response"]
+    except sqlite3.Error as e:
+        print(f"Error reading chat response cache: {e}")
+        return None
+    finally:
+        conn.close()
+
+def store_response(cache_key, response, user_id):
+    now = time.time()
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """INSERT OR REPLACE INTO chat_response_cache (cache_key, response, created_at, last_used_at, hit_count, user_id)
+               VALUES (?, ?, ?, ?, 0, ?)""",
+            (cache_key, response, now, now, user_id)
+        )
+        # Drop expired entries, then least-recently-used ones beyond the size bound.
+        conn.execute("DELETE FROM chat_response_cache WHERE created_at < ?", (now - RESPONSE_CACHE_TTL_SECONDS,))
+        conn.execute(
+            """DELETE FROM chat_response_cache WHERE cache_key IN (
+                   SELECT cache_key FROM chat_response_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)""",
+            (RESPONSE_CACHE_MAX_ENTRIES,)
+        )
+        conn.commit()
+        _count("stores")
+        return True
+    except sqlite3.Error as e:
+        print(f"Error writing chat response cache: {e}")
+        return False
+    finally:
+        conn.close()
+
+def response_cache_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    stats["enabled"] = RESPONSE_CACHE_ENABLED
+    return stats
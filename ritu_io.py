@@ -0,0 +1,322 @@
+import csv
+import json
+import sqlite3
+from datetime import date
+
+from cache import bump_user_version
+from db import get_user_db_connection, symptom_entry_rows
+from prediction import rebuild_Ritu_stats
+
+# Bulk import and streaming export of a user's Ritu history (CSV, JSON array or NDJSON).
+# Imports are parsed record by record, validated, de-duplicated against existing
+# Ritu_data start dates and written with executemany in chunked transactions; exports
+# read through a cursor in batches, so neither side holds the whole history in memory.
+
+IMPORT_CHUNK_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+FORMATS = ("csv", "json", "ndjson")
+BASE_FIELDS = ("period_start_date", "period_end_date", "symptoms", "notes")
+EXPORT_FIELDS = ("period_start_date", "period_end_date", "symptoms", "notes", "logged_at")
+MAX_REPORTED_ERRORS = 20
+
+
+def detect_format(filename=None, first_char=None):
+    if filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        if extension in ("jsonl", "ndjson"):
+            return "ndjson"
+        if extension in FORMATS:
+            return extension
+    if first_char == "[":
+        return "json"
+    if first_char == "{":
+        return "ndjson"
+    return "csv"
+
+
+# --- Parsing ---
+def _iter_json_array(fileobj, read_size=65536):
+    # Incremental parser for a top-level JSON array: decodes one element at a time
+    # from a sliding buffer instead of json.load()-ing the whole file.
+    decoder = json.JSONDecoder()
+    buffer = fileobj.read(read_size)
+    position = 0
+    started = False
+    eof = not buffer
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if not started:
+            if position < len(buffer):
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array of entries.")
+                started = True
+                position += 1
+                continue
+        elif position < len(buffer) and buffer[position] == "]":
+            return
+        if position >= len(buffer) and eof:
+            if started:
+                raise ValueError("Unexpected end of JSON array.")
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = fileobj.read(read_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+        position = end
+        if position > read_size:
+            buffer = buffer[position:]
+            position = 0
+
+def _iter_ndjson(fileobj):
+    # A bad line only invalidates that entry; it is passed on as the error to report.
+    for line in fileobj:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield ValueError(f"invalid JSON ({e})")
+
+def _coerce_csv_value(value):
+    if value is None or value == "":
+        return None
+    lowered = value.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+def _iter_csv(fileobj):
+    # Either a JSON `symptoms` column (as exported), or one column per symptom.
+    for row in csv.DictReader(fileobj):
+        record = {key: (row.get(key) or None) for key in ("period_start_date", "period_end_date", "notes")}
+        symptoms = {}
+        if row.get("symptoms"):
+            try:
+                symptoms.update(json.loads(row["symptoms"]))
+            except (ValueError, TypeError):
+                yield ValueError("symptoms column is not a JSON object")
+                continue
+        for key, value in row.items():
+            if key and key not in BASE_FIELDS and key != "logged_at":
+                coerced = _coerce_csv_value(value)
+                if coerced is not None:
+                    symptoms[key] = coerced
+        record["symptoms"] = symptoms or None
+        yield record
+
+def iter_import_records(fileobj, fmt):
+    if fmt == "json":
+        return _iter_json_array(fileobj)
+    if fmt == "ndjson":
+        return _iter_ndjson(fileobj)
+    return _iter_csv(fileobj)
+
+def _valid_date(value):
+    if not value:
+        return None
+    # date.fromisoformat is C-implemented and much cheaper than strptime per row.
+    return date.fromisoformat(str(value).strip()[:10]).isoformat()
+
+def _normalize_record(record):
+    if isinstance(record, ValueError):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("entry is not an object")
+    start = _valid_date(record.get("period_start_date"))
+    if not start:
+        raise ValueError("missing period_start_date")
+    end = _valid_date(record.get("period_end_date"))
+    if end and end < start:
+        raise ValueError(f"period_end_date {end} is before period_start_date {start}")
+    symptoms = record.get("symptoms")
+    if isinstance(symptoms, str):
+        symptoms = json.loads(symptoms) if symptoms.strip() else None
+    if symptoms is not None and not isinstance(symptoms, dict):
+        raise ValueError("symptoms must be an object")
+    notes = record.get("notes")
+    return start, end, symptoms or None, (str(notes) if notes not in (None, "") else None)
+
+
+# --- Import ---
+def _write_chunk(conn, user_id, chunk):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM Ritu_data").fetchone()[0]
+        conn.executemany(
+            """INSERT INTO Ritu_data (user_id, period_start_date, period_end_date, symptoms, notes)
+               VALUES (?, ?, ?, ?, ?)""",
+            [(user_id, start, end, json.dumps(symptoms) if symptoms else None, notes)
+             for start, end, symptoms, notes in chunk]
+        )
+        # Inside the IMMEDIATE transaction nobody else can insert, so the new ids are exactly
+        # those above last_id; start dates are unique per import, so they map rows back.
+        new_ids = dict(conn.execute(
+            "SELECT period_start_date, id FROM Ritu_data WHERE user_id = ? AND id > ?", (user_id, last_id)
+        ).fetchall())
+        symptom_rows = []
+        for start, _, symptoms, _ in chunk:
+            if symptoms:
+                symptom_rows.extend(symptom_entry_rows(new_ids[start], user_id, start, symptoms))
+        if symptom_rows:
+            conn.executemany(
+                """INSERT INTO symptom_entries
+                   (Ritu_data_id, user_id, period_start_date, name, value_text, value_num)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                symptom_rows
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def import_Ritu_history(user_id, fileobj, fmt="csv", chunk_size=IMPORT_CHUNK_SIZE):
+    # Returns (success, message, summary). Invalid entries are skipped and reported,
+    # entries whose start date is already logged (or repeated in the file) are skipped.
+    summary = {"imported": 0, "duplicates": 0, "invalid": 0, "errors": []}
+    conn = get_user_db_connection(user_id)
+    try:
+        seen_starts = {row[0] for row in conn.execute(
+            "SELECT period_start_date FROM Ritu_data WHERE user_id = ?", (user_id,))}
+        latest_start = None
+        chunk = []
+        records = iter_import_records(fileobj, fmt)
+        entry_number = 0
+        while True:
+            entry_number += 1
+            try:
+                record = next(records)
+            except StopIteration:
+                break
+            except (ValueError, csv.Error) as e:
+                # The stream itself is broken (malformed JSON/CSV); stop here.
+                summary["invalid"] += 1
+                summary["errors"].append(f"Entry {entry_number}: {e}")
+                break
+            try:
+                start, end, symptoms, notes = _normalize_record(record)
+            except (ValueError, TypeError) as e:
+                summary["invalid"] += 1
+                if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                    summary["errors"].append(f"Entry {entry_number}: {e}")
+                continue
+            if start in seen_starts:
+                summary["duplicates"] += 1
+                continue
+            seen_starts.add(start)
+            chunk.append((start, end, symptoms, notes))
+            if latest_start is None or start > latest_start:
+                latest_start = start
+            if len(chunk) >= chunk_size:
+                _write_chunk(conn, user_id, chunk)
+                summary["imported"] += len(chunk)
+                chunk = []
+        if chunk:
+            _write_chunk(conn, user_id, chunk)
+            summary["imported"] += len(chunk)
+        if latest_start:
+            # One profile update and one Ritu_stats rebuild for the whole import.
+            conn.execute(
+                """UPDATE user_profiles SET last_period_start = ?
+                   WHERE user_id = ? AND (last_period_start IS NULL OR last_period_start < ?)""",
+                (latest_start, user_id, latest_start)
+            )
+            rebuild_Ritu_stats(conn.cursor(), user_id)
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error in import_Ritu_history: {e}")
+        return False, f"Database error: {e}", summary
+    finally:
+        conn.close()
+        if summary["imported"]:
+            bump_user_version(user_id)
+    message = f"Imported {summary['imported']} entries"
+    if summary["duplicates"]: message += f", skipped {summary['duplicates']} already logged"
+    if summary["invalid"]: message += f", skipped {summary['invalid']} invalid"
+    return True, message + ".", summary
+
+
+# --- Export ---
+def iter_Ritu_history_rows(user_id, batch_size=EXPORT_BATCH_SIZE):
+    # Oldest first; symptoms stay as JSON text (NULL when the stored blob is not valid JSON).
+    # Keyset-paged on (period_start_date, id) with a fresh pooled connection per batch, so
+    # no connection is held while the caller consumes rows (or abandons the generator,
+    # possibly on another thread).
+    last_key = ("", 0)
+    while True:
+        conn = get_user_db_connection(user_id)
+        try:
+            rows = conn.execute(
+                """SELECT id, period_start_date, period_end_date,
+                          CASE WHEN json_valid(symptoms) THEN symptoms END AS symptoms, notes, logged_at
+                   FROM Ritu_data WHERE user_id = ? AND (period_start_date, id) > (?, ?)
+                   ORDER BY period_start_date, id LIMIT ?""",
+                (user_id, last_key[0], last_key[1], batch_size)
+            ).fetchall()
+        finally:
+            conn.close()
+        yield from rows
+        if len(rows) < batch_size:
+            break
+        last_key = (rows[-1]["period_start_date"], rows[-1]["id"])
+
+def _json_object(row):
+    # The symptoms column is already JSON, so it is spliced in rather than decoded and re-encoded.
+    parts = []
+    for field in EXPORT_FIELDS:
+        value = row[field]
+        encoded = value if field == "symptoms" and value is not None else json.dumps(value)
+        parts.append(f"{json.dumps(field)}: {encoded}")
+    return "{" + ", ".join(parts) + "}"
+
+class _LineBuffer:
+    def __init__(self):
+        self.value = ""
+    def write(self, text):
+        self.value += text
+
+def iter_export_chunks(user_id, fmt="csv"):
+    # Yields the export as text pieces (one per entry, plus framing).
+    rows = iter_Ritu_history_rows(user_id)
+    if fmt == "csv":
+        line = _LineBuffer()
+        writer = csv.writer(line, lineterminator="\n")
+        writer.writerow(EXPORT_FIELDS)
+        yield line.value
+        for row in rows:
+            line.value = ""
+            writer.writerow([row[field] for field in EXPORT_FIELDS])
+            yield line.value
+    elif fmt == "json":
+        yield "["
+        for index, row in enumerate(rows):
+            yield ("," if index else "") + "\n" + _json_object(row)
+        yield "\n]\n"
+    elif fmt == "ndjson":
+        for row in rows:
+            yield _json_object(row) + "\n"
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+def export_Ritu_history(user_id, out, fmt="csv"):
+    # Streams the export into a text file-like object; returns the number of entries written.
+    pieces = 0
+    for piece in iter_export_chunks(user_id, fmt):
+        out.write(piece)
+        pieces += 1
+    framing = {"csv": 1, "json": 2, "ndjson": 0}[fmt]  # header line / opening and closing brackets
+    return pieces - framing
@@ -0,0 +1,99 @@
+import argparse
+import sys
+import time
+
+from db import (DATABASE_NAME, SHARD_BUCKETS, SHARD_DIR, SHARD_POOL_SIZE, SHARDED, USER_SHARD_TABLES,
+                connect_database, get_db_connection, shard_path)
+
+# One-off migration from a single database to sharded storage: copies every user's rows
+# (USER_SHARD_TABLES) from MYRITU_DB_PATH into the shard file they belong to. Run it with
+# the app stopped and with the same settings the app will use:
+#
+#   MYRITU_STORAGE_MODE=sharded MYRITU_SHARD_BUCKETS=16 python split_shards.py --prune
+#
+# Rows keep their ids and are inserted with INSERT OR IGNORE, so an interrupted run can
+# simply be repeated. --prune then deletes the copied rows from the main database.
+
+
+def _table_columns(conn, schema, table):
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})").fetchall()]
+
+def _copy_shard(database, user_ids):
+    # Copies user_ids' rows from the main database (attached as "source") into one shard;
+    # returns {table: rows inserted}.
+    copied = {}
+    conn = connect_database(database, SHARD_POOL_SIZE, create=True)
+    try:
+        conn.execute("ATTACH DATABASE ? AS source", (DATABASE_NAME,))
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for table in USER_SHARD_TABLES:
+                # Named columns, in case the two files' columns ended up in a different order.
+                source_columns = set(_table_columns(conn, "source", table))
+                columns = ", ".join(column for column in _table_columns(conn, "main", table) if column in source_columns)
+                cursor = conn.executemany(
+                    f"INSERT OR IGNORE INTO main.{table} ({columns}) SELECT {columns} FROM source.{table} WHERE user_id = ?",
+                    [(user_id,) for user_id in user_ids]
+                )
+                copied[table] = max(cursor.rowcount, 0)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute("DETACH DATABASE source")
+    finally:
+        conn.close()
+    return copied
+
+def split_database(prune=False, progress=None):
+    # Returns {table: rows copied}.
+    conn = get_db_connection()
+    try:
+        user_ids = [row[0] for row in conn.execute("SELECT id FROM users ORDER BY id").fetchall()]
+    finally:
+        conn.close()
+    shards = {}
+    for user_id in user_ids:
+        shards.setdefault(shard_path(user_id), []).append(user_id)
+
+    totals = dict.fromkeys(USER_SHARD_TABLES, 0)
+    started = time.perf_counter()
+    for index, (database, shard_user_ids) in enumerate(shards.items(), 1):
+        for table, count in _copy_shard(database, shard_user_ids).items():
+            totals[table] += count
+        if progress:
+            progress(index, len(shards), time.perf_counter() - started)
+
+    if prune:
+        conn = get_db_connection()
+        try:
+            for table in USER_SHARD_TABLES:
+                conn.execute(f"DELETE FROM {table}")
+            conn.commit()
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+    return totals
+
+def _print_progress(done, total, elapsed):
+    if done == total or done % 100 == 0:
+        print(f"  {done}/{total} shard files ({elapsed:.1f}s)", flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Split the MyRitu database into per-user or bucketed shard files")
+    parser.add_argument("--prune", action="store_true", help="delete the copied rows from the main database afterwards")
+    args = parser.parse_args(argv)
+    if not SHARDED:
+        print("Set MYRITU_STORAGE_MODE=sharded (and MYRITU_SHARD_BUCKETS / MYRITU_SHARD_DIR as the app will use them).")
+        return 2
+
+    layout = f"{SHARD_BUCKETS} bucket files" if SHARD_BUCKETS > 0 else "one file per user"
+    print(f"Splitting {DATABASE_NAME} into {SHARD_DIR} ({layout})")
+    totals = split_database(args.prune, _print_progress)
+    print("Copied " + ", ".join(f"{count} {table}" for table, count in totals.items())
+          + (" and pruned the main database." if args.prune else "."))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,78 +1,127 @@
 import streamlit as st
 from streamlit_calendar import calendar
 import datetime
-from db import log_period_data, get_Ritu_history
+from cache import LRUCache, user_cache_key
+from instrumentation import timed
+from db import log_period_data, get_Ritu_history, get_Ritu_history_range, get_Ritu_stats
 from auth import get_user_profile, update_user_profile
-from utils import calculate_next_period
+from utils import iter_predicted_Ritus
+from prediction import predict_next_period
 
-def show_calendar_tab():
-    st.title("🗓️ MyRitu Calendar & Logger")
+# Built event lists per (user, data version, profile averages, visible window).
+CALENDAR_EVENTS_CACHE_MAX_ENTRIES = 512
+# Days loaded either side of the displayed month: covers the leading/trailing weeks of the
+# month grid and the week/day views around it.
+CALENDAR_MARGIN_DAYS = 14
+# Periods that started this long before the window can still be running inside it.
+PERIOD_LOOKBACK_DAYS = 60
 
-    user_id = st.session_state.user_id
-    profile = get_user_profile(user_id)
-    st.session_state.profile_info = profile
+_calendar_events_cache = LRUCache(CALENDAR_EVENTS_CACHE_MAX_ENTRIES)
 
-    Ritu_history = get_Ritu_history(user_id)
+def _calendar_window(month_start):
+    next_month = (month_start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    margin = datetime.timedelta(days=CALENDAR_MARGIN_DAYS)
+    return month_start - margin, next_month + margin
 
-    calendar_events = []
-    avg_period_len_profile = profile.get('avg_period_length', 5)
+def _day_after(day):
+    return (day + datetime.timedelta(days=1)).isoformat()
 
-    for entry in Ritu_history:
-        start_date = datetime.datetime.strptime(entry['period_start_date'], '%Y-%m-%d')
-        end_date_str = entry.get('period_end_date')
-        if end_date_str:
-            end_date = datetime.datetime.strptime(end_date_str, '%Y-%m-%d')
-        else:
-            end_date = start_date + datetime.timedelta(days=avg_period_len_profile - 1)
+@timed
+def build_calendar_events(user_id, window_start, window_end, last_period_start, avg_period_len, avg_Ritu_len):
+    cache_key = user_cache_key("calendar_events", user_id) + (window_start, window_end, avg_period_len, avg_Ritu_len)
+    cached = _calendar_events_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
+    calendar_events = []
+    lookback_start = window_start - datetime.timedelta(days=PERIOD_LOOKBACK_DAYS)
+    for entry in get_Ritu_history_range(user_id, lookback_start.isoformat(), window_end.isoformat()):
+        start_str = entry['period_start_date']
+        end_str = entry.get('period_end_date')
+        if end_str:
+            end_exclusive = _day_after(datetime.date.fromisoformat(end_str))
+        else:
+            end_exclusive = (datetime.date.fromisoformat(start_str) + datetime.timedelta(days=avg_period_len)).isoformat()
+        if end_exclusive <= window_start.isoformat():
+            continue
         calendar_events.append({
-            "title": "🩸 Period", "start": start_date.strftime('%Y-%m-%d'),
-            "end": (end_date + datetime.timedelta(days=1)).strftime('%Y-%m-%d'),
+            "title": "🩸 Period", "start": start_str, "end": end_exclusive,
             "color": "#D32F2F", "textColor": "#FFFFFF", "resourceId": "period"
         })
-        if entry.get('symptoms'):
-             calendar_events.append({
-                "title": f"Symptoms Logged", "start": start_date.strftime('%Y-%m-%d'),
+        if entry.get('symptoms') and start_str >= window_start.isoformat():
+            calendar_events.append({
+                "title": f"Symptoms Logged", "start": start_str,
                 "color": "#C2185B", "textColor": "#FFFFFF", "resourceId": "symptoms"
             })
 
-    latest_period_start_str = profile.get('last_period_start')
-    avg_Ritu_length_profile = profile.get('avg_Ritu_length', profile.get('avg_Ritu_length', 28))
-
-    if latest_period_start_str and avg_Ritu_length_profile:
-        current_pred_start_str = latest_period_start_str
-        for _ in range(3):
-            next_p, next_o, next_fw = calculate_next_period(current_pred_start_str, avg_Ritu_length_profile)
-            if next_p:
-                next_p_date = datetime.datetime.strptime(next_p, '%Y-%m-%d')
-                calendar_events.append({
-                    "title": "Predicted Period", "start": next_p_date.strftime('%Y-%m-%d'),
-                    "end": (next_p_date + datetime.timedelta(days=avg_period_len_profile)).strftime('%Y-%m-%d'),
-                    "color": "#F06292", "borderColor": "#C2185B", "textColor": "#FFFFFF", "resourceId": "predicted_period"
-                })
-            if next_o and next_fw:
-                next_o_date = datetime.datetime.strptime(next_o, '%Y-%m-%d')
-                fw_start_date = datetime.datetime.strptime(next_fw[0], '%Y-%m-%d')
-                fw_end_date = datetime.datetime.strptime(next_fw[1], '%Y-%m-%d')
-                calendar_events.append({"title": "🥚 Predicted Ovulation", "start": next_o_date.strftime('%Y-%m-%d'), 
-                                        "end": (next_o_date + datetime.timedelta(days=1)).strftime('%Y-%m-%d'), 
-                                        "color": "#00796B", "textColor": "#FFFFFF", "resourceId": "ovulation"})
-                calendar_events.append({"title": "💚 Predicted Fertile Window", "start": fw_start_date.strftime('%Y-%m-%d'), 
-                                        "end": (fw_end_date + datetime.timedelta(days=1)).strftime('%Y-%m-%d'), 
-                                        "backgroundColor": "#388E3C", "borderColor": "#1B5E20", "textColor": "#FFFFFF", "resourceId": "fertile_window"})
-            if next_p: current_pred_start_str = next_p
-            else: break
+    # Predictions are generated only for the Ritus that can touch the window.
+    for next_p, next_o, next_fw in iter_predicted_Ritus(last_period_start, avg_Ritu_len, from_date=window_start):
+        if next_fw[0] > window_end:
+            break
+        if next_p <= window_end:
+            calendar_events.append({
+                "title": "Predicted Period", "start": next_p.isoformat(),
+                "end": (next_p + datetime.timedelta(days=avg_period_len)).isoformat(),
+                "color": "#F06292", "borderColor": "#C2185B", "textColor": "#FFFFFF", "resourceId": "predicted_period"
+            })
+        calendar_events.append({"title": "🥚 Predicted Ovulation", "start": next_o.isoformat(),
+                                "end": _day_after(next_o),
+                                "color": "#00796B", "textColor": "#FFFFFF", "resourceId": "ovulation"})
+        calendar_events.append({"title": "💚 Predicted Fertile Window", "start": next_fw[0].isoformat(),
+                                "end": _day_after(next_fw[1]),
+                                "backgroundColor": "#388E3C", "borderColor": "#1B5E20", "textColor": "#FFFFFF", "resourceId": "fertile_window"})
+
+    _calendar_events_cache.put(cache_key, calendar_events)
+    return calendar_events
+
+def _shift_month(month_start, months):
+    month_index = month_start.year * 12 + month_start.month - 1 + months
+    return datetime.date(month_index // 12, month_index % 12 + 1, 1)
+
+@timed
+def show_calendar_tab():
+    st.title("🗓️ MyRitu Calendar & Logger")
+
+    user_id = st.session_state.user_id
+    profile = get_user_profile(user_id)
+    st.session_state.profile_info = profile
+
+    avg_period_len_profile = profile.get('avg_period_length') or 5
+    avg_Ritu_length_profile = profile.get('avg_Ritu_length')
+    # Predicted Ritus use the length estimated from the logged history when there is enough of it.
+    prediction = predict_next_period(get_Ritu_stats(user_id), profile.get('last_period_start'), avg_Ritu_length_profile)
+    predicted_last_start = prediction['last_period_start'].strftime('%Y-%m-%d') if prediction else None
+    predicted_Ritu_length = prediction['Ritu_length_days'] if prediction else None
+
+    # Month navigation lives in Streamlit so only the displayed month's events are built and sent.
+    if 'calendar_month' not in st.session_state:
+        st.session_state.calendar_month = datetime.date.today().replace(day=1)
+    nav_prev, nav_today, nav_next, _ = st.columns([1, 1, 1, 5])
+    if nav_prev.button("◀ Prev", key="calendar_prev_month"):
+        st.session_state.calendar_month = _shift_month(st.session_state.calendar_month, -1)
+    if nav_today.button("Today", key="calendar_this_month"):
+        st.session_state.calendar_month = datetime.date.today().replace(day=1)
+    if nav_next.button("Next ▶", key="calendar_next_month"):
+        st.session_state.calendar_month = _shift_month(st.session_state.calendar_month, 1)
+    month_start = st.session_state.calendar_month
+
+    window_start, window_end = _calendar_window(month_start)
+    calendar_events = build_calendar_events(user_id, window_start, window_end, predicted_last_start,
+                                            avg_period_len_profile, predicted_Ritu_length)
 
     calendar_options = {
-        "headerToolbar": {"left": "prev,next today", "center": "title", "right": "dayGridMonth,timeGridWeek,timeGridDay"},
-        "initialView": "dayGridMonth", "selectable": True, "editable": False, "height": 650,
+        "headerToolbar": {"left": "", "center": "title", "right": "dayGridMonth,timeGridWeek,timeGridDay"},
+        "initialView": "dayGridMonth", "initialDate": month_start.isoformat(),
+        "selectable": True, "editable": False, "height": 650,
         "resources": [
             {"id": "period", "title": "Period"}, {"id": "predicted_period", "title": "Predicted Period"},
             {"id": "ovulation", "title": "Ovulation"}, {"id": "fertile_window", "title": "Fertile Window"},
             {"id": "symptoms", "title": "Symptoms"},
         ]
     }
-    selected_event = calendar(events=calendar_events, options=calendar_options, key="Ritu_calendar_main_v2")
+    # Keyed per month so the component remounts on the new initialDate.
+    selected_event = calendar(events=calendar_events, options=calendar_options,
+                              key=f"Ritu_calendar_main_v2_{month_start:%Y%m}")
 
     st.markdown("---")
     st.subheader("Log New Period / Symptoms")
@@ -117,8 +166,9 @@ def show_calendar_tab():
     # ... (Ritu History display as before) ...
     st.markdown("---")
     st.subheader("Ritu History (Last 5)")
+    Ritu_history = get_Ritu_history(user_id, limit=5)
     if Ritu_history:
-        for entry in Ritu_history[:5]:
+        for entry in Ritu_history:
             st.text(f"Period: {entry['period_start_date']} to {entry.get('period_end_date', 'N/A')}")
             if entry.get('symptoms'): st.text(f"  Symptoms: {entry['symptoms']}")
             if entry.get('notes'): st.text(f"  Notes: {entry['notes']}")
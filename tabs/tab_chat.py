@@ -3,26 +3,63 @@ import requests
 from datetime import datetime
 import json
 import os
+import uuid
 from dotenv import load_dotenv
-import pandas as pd
 
 from auth import get_user_profile
-from db import get_Ritu_history, log_chat_message, get_chat_history_from_db # Import DB chat functions
+from cache import LRUCache, user_data_cache, user_cache_key
+from inference_client import CircuitOpenError
+from chat_backends import ChatBackendUnavailable, chat_backend_available, get_chat_backend
+from chat_jobs import submit_chat_job, get_chat_job, make_request_key, ChatJobError, ChatQueueFullError
+from instrumentation import timed
+from response_cache import is_cacheable, make_cache_key, get_cached_response, store_response, response_cache_stats
+from db import CHAT_HISTORY_PAGE_SIZE, chat_log_id, user_exists, get_Ritu_history, load_Ritu_history_df, log_chat_message, get_chat_history_from_db, get_symptom_value_counts, get_symptom_stats
 # from utils import get_age_from_birthdate_chat # Defined below or import if preferred
 
 load_dotenv()
 HF_API_TOKEN = os.getenv("HF_API_TOKEN")
 PINK_TEXT_COLOR = "#E57396"
 
-CHAT_MODEL_ID = "HuggingFaceH4/zephyr-7b-beta"
-API_URL_CHAT = f"https://api-inference.huggingface.co/models/{CHAT_MODEL_ID}"
+CHAT_STREAMING = os.getenv("MYRITU_CHAT_STREAMING", "1") != "0"
+CHAT_HTML_CACHE_MAX_ENTRIES = 20000
 
+# Replies come from the configured chat backend (chat_backends.py): the remote inference
+# endpoint, or a local CPU model, which needs no HF_API_TOKEN.
+@timed
 def query_hf_slm(payload, api_token_to_use):
-    headers = {"Authorization": f"Bearer {api_token_to_use}"}
-    params = {"wait_for_model": True}
-    response = requests.post(API_URL_CHAT, headers=headers, json=payload, params=params)
-    response.raise_for_status()
-    return response.json()
+    return get_chat_backend(api_token_to_use).generate(payload)
+
+def stream_hf_slm(payload, api_token_to_use, stream_stats=None):
+    # Yields the reply piece by piece; stream_stats gets time-to-first-token and tokens/s.
+    return get_chat_backend(api_token_to_use).stream(payload, stream_stats)
+
+def render_message_html(sender, message_content):
+    if sender == "user":
+        return f"<div style='display: flex; justify-content: flex-end; margin-bottom: 10px;'><div style='background-color: #F8BBD0; color: #383838; padding: 10px 15px; border-radius: 15px 15px 0 15px; max-width: 70%; font-size: 1em; line-height: 1.5;'><b>You:</b><br>{message_content}</div></div>"
+    return f"<div style='display: flex; justify-content: flex-start; margin-bottom: 10px;'><div style='background-color: #E3F2FD; color: #383838; padding: 10px 15px; border-radius: 15px 15px 15px 0; max-width: 70%; font-size: 1em; line-height: 1.5;'><b>MyRitu Bot:</b><br>{message_content}</div></div>"
+
+_message_html_cache = LRUCache(CHAT_HTML_CACHE_MAX_ENTRIES)
+
+def message_html(user_id, msg):
+    # Bubble HTML for a displayed message, cached per (user, chat_logs id): with sharded
+    # storage every user's chat_logs ids start at 1, so the id alone is not unique. Messages
+    # not persisted yet (no id, or a queued write still pending) are rendered directly.
+    message_id = chat_log_id(msg.get("id"))
+    if message_id is None:
+        return render_message_html(msg["sender"], msg["message"])
+    msg["id"] = message_id  # a queued write has committed: keep just its id
+    cache_key = (user_id, message_id)
+    html = _message_html_cache.get(cache_key)
+    if html is None:
+        html = render_message_html(msg["sender"], msg["message"])
+        _message_html_cache.put(cache_key, html)
+    return html
+
+def clean_bot_response(bot_response):
+    bot_response = bot_response.strip()
+    if "<|assistant|>" in bot_response: bot_response = bot_response.split("<|assistant|>")[-1].strip()
+    if not bot_response: bot_response = "I seem to be at a loss for words. Could you try rephrasing, dear?"
+    return bot_response
 
 def get_age_from_birthdate_chat(birth_date_str):
     if not birth_date_str: return None
@@ -32,10 +69,7 @@ def get_age_from_birthdate_chat(birth_date_str):
         return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
     except ValueError: return None
 
-def generate_user_Ritu_context(user_id):
-    # ... (Context generation logic remains the same as your last provided version)
-    profile = get_user_profile(user_id)
-    history = get_Ritu_history(user_id)
+def _profile_summary(profile):
     context = "User Profile for MyRitu App:\n"
     if profile.get('full_name'): context += f"- Name: {profile['full_name']}\n"
     age = get_age_from_birthdate_chat(profile.get('birth_date'))
@@ -56,7 +90,10 @@ def generate_user_Ritu_context(user_id):
     if profile.get('medical_conditions'): context += f"- Medical Conditions: {profile['medical_conditions']}\n"
     if profile.get('medications'): context += f"- Medications: {profile['medications']}\n"
     if profile.get('preferences'): context += f"- User Preferences/Concerns: {profile['preferences']}\n"
-    context += "\nRecent Ritu History (up to last 3 entries for prompt brevity):\n"
+    return context
+
+def _recent_history_summary(history):
+    context = "\nRecent Ritu History (up to last 3 entries for prompt brevity):\n"
     if history:
         for entry in history[:3]:
             context += f"- Period started: {entry['period_start_date']}, Ended: {entry.get('period_end_date', 'N/A')}\n"
@@ -64,43 +101,162 @@ def generate_user_Ritu_context(user_id):
                 symptoms_str = ", ".join([f"{k}: {v}" for k, v in entry['symptoms'].items()])
                 context += f"  Symptoms: {symptoms_str}\n"
     else: context += "- No Ritu history logged yet.\n"
-    if len(history) >= 1:
-        df = pd.DataFrame(history)
-        df['period_start_date'] = pd.to_datetime(df['period_start_date'])
-        df = df.sort_values(by='period_start_date', ascending=False)
-        if len(history) >=2:
-            df_calc = df.sort_values(by='period_start_date')
-            df_calc['next_period_start_date'] = df_calc['period_start_date'].shift(-1)
-            df_calc['Ritu_length_calculated'] = (df_calc['next_period_start_date'] - df_calc['period_start_date']).dt.days
-            df_Ritus_calc = df_calc.dropna(subset=['Ritu_length_calculated'])
-            if not df_Ritus_calc.empty:
-                avg_calculated_len = df_Ritus_calc['Ritu_length_calculated'].mean()
-                min_len, max_len = df_Ritus_calc['Ritu_length_calculated'].min(), df_Ritus_calc['Ritu_length_calculated'].max()
-                context += f"\nCalculated Ritu Length Insights (based on {len(df_Ritus_calc)} logged Ritus):\n"
-                context += f"- Average calculated Ritu length: {avg_calculated_len:.1f} days.\n"
-                context += f"- Shortest Ritu length: {min_len:.0f} days, Longest: {max_len:.0f} days.\n"
-                if len(df_Ritus_calc['Ritu_length_calculated']) > 1:
-                    recent_lengths = df_Ritus_calc['Ritu_length_calculated'].tail(3).tolist()
-                    context += f"- Most recent Ritu lengths: {', '.join(map(str, recent_lengths))} days.\n"
-        symptom_summary_data = []
-        for entry in history:
-            if entry.get('symptoms'):
-                symptom_entry = entry['symptoms'].copy(); symptom_entry['date'] = entry['period_start_date']
-                symptom_summary_data.append(symptom_entry)
-        if symptom_summary_data:
-            df_symptoms_summary = pd.DataFrame(symptom_summary_data)
-            context += "\nSymptom Summary (from all logged history):\n"
-            if 'mood' in df_symptoms_summary.columns:
-                common_moods = df_symptoms_summary['mood'].value_counts().nlargest(2)
-                if not common_moods.empty: context += f"- Most common moods logged: {', '.join([f'{idx} ({val} times)' for idx, val in common_moods.items()])}.\n"
-            if 'pain_cramps' in df_symptoms_summary.columns:
-                df_symptoms_summary['pain_cramps_numeric'] = pd.to_numeric(df_symptoms_summary['pain_cramps'], errors='coerce')
-                avg_pain = df_symptoms_summary['pain_cramps_numeric'].mean()
-                max_pain = df_symptoms_summary['pain_cramps_numeric'].max()
-                if pd.notna(avg_pain): context += f"- Average pain/cramp level logged: {avg_pain:.1f} (0-5).\n"
-                if pd.notna(max_pain): context += f"- Maximum pain/cramp level logged: {max_pain:.0f}.\n"
     return context
 
+def _Ritu_length_summary(user_id):
+    context = ""
+    df_calc = load_Ritu_history_df(user_id, columns=['period_start_date'])
+    if len(df_calc) >= 2:
+        df_calc['next_period_start_date'] = df_calc['period_start_date'].shift(-1)
+        df_calc['Ritu_length_calculated'] = (df_calc['next_period_start_date'] - df_calc['period_start_date']).dt.days
+        df_Ritus_calc = df_calc.dropna(subset=['Ritu_length_calculated'])
+        if not df_Ritus_calc.empty:
+            avg_calculated_len = df_Ritus_calc['Ritu_length_calculated'].mean()
+            min_len, max_len = df_Ritus_calc['Ritu_length_calculated'].min(), df_Ritus_calc['Ritu_length_calculated'].max()
+            context += f"\nCalculated Ritu Length Insights (based on {len(df_Ritus_calc)} logged Ritus):\n"
+            context += f"- Average calculated Ritu length: {avg_calculated_len:.1f} days.\n"
+            context += f"- Shortest Ritu length: {min_len:.0f} days, Longest: {max_len:.0f} days.\n"
+            if len(df_Ritus_calc['Ritu_length_calculated']) > 1:
+                recent_lengths = df_Ritus_calc['Ritu_length_calculated'].tail(3).tolist()
+                context += f"- Most recent Ritu lengths: {', '.join(map(str, recent_lengths))} days.\n"
+    return context
+
+def _symptom_summary(user_id):
+    context = ""
+    symptom_stats = get_symptom_stats(user_id)
+    if symptom_stats:
+        context += "\nSymptom Summary (from all logged history):\n"
+        common_moods = get_symptom_value_counts(user_id, 'mood')[:2]
+        if common_moods: context += f"- Most common moods logged: {', '.join([f'{mood} ({count} times)' for mood, count in common_moods])}.\n"
+        pain = symptom_stats.get('pain_cramps')
+        if pain and pain['avg'] is not None:
+            context += f"- Average pain/cramp level logged: {pain['avg']:.1f} (0-5).\n"
+            context += f"- Maximum pain/cramp level logged: {pain['max']:.0f}.\n"
+        fatigue = symptom_stats.get('fatigue')
+        if fatigue and fatigue['avg'] is not None:
+            context += f"- Average fatigue level logged: {fatigue['avg']:.1f} (0-5).\n"
+    return context
+
+def get_user_context_parts(user_id):
+    # The context only changes when the user's profile or Ritu data is written (which bumps
+    # their data version) or, through the age line, when the date changes.
+    cache_key = user_cache_key("chat_context", user_id) + (datetime.now().date(),)
+    parts = user_data_cache.get(cache_key)
+    if parts is None:
+        parts = {
+            "profile": _profile_summary(get_user_profile(user_id)),
+            "recent_history": _recent_history_summary(get_Ritu_history(user_id, limit=3)),
+            "Ritu_lengths": _Ritu_length_summary(user_id),
+            "symptoms": _symptom_summary(user_id),
+        }
+        user_data_cache.put(cache_key, parts)
+    return dict(parts)
+
+@timed
+def generate_user_Ritu_context(user_id):
+    return "".join(get_user_context_parts(user_id).values())
+
+CHAT_POLL_SECONDS = float(os.getenv("MYRITU_CHAT_POLL_SECONDS", "0.5"))
+CONNECTION_FALLBACK_REPLY = "Oh dear, my connection seems a bit weak. Could you try asking again in a moment?"
+UNEXPECTED_FALLBACK_REPLY = "Goodness, something unexpected happened on my end!"
+
+def build_chat_payload(user_id, question):
+    user_context_summary = generate_user_Ritu_context(user_id)
+    system_prompt = f"""<|system|>
+You are MyRitu Chat... (rest of your detailed system prompt from previous version) ...
+
+User's Context:
+{user_context_summary}</s>
+<|user|>
+My question is: "{question}"</s>
+<|assistant|>
+"""
+    return {"inputs": system_prompt, "parameters": {"max_new_tokens": 450, "return_full_text": False, "temperature": 0.7, "top_p": 0.9, "do_sample": True, "repetition_penalty": 1.1}}
+
+@timed
+def _generate_bot_response(job, payload):
+    # Returns the raw generated text, or None if the API answered in an unexpected shape.
+    if CHAT_STREAMING:
+        # Tokens are appended to the job as they arrive; the tab renders job.partial while polling.
+        # Time to first token and tokens/s go to the backend's metrics (debug panel).
+        streamed_text = ""
+        for piece in stream_hf_slm(payload, HF_API_TOKEN):
+            streamed_text += piece
+            job.append_partial(piece)
+        return streamed_text
+    api_result = query_hf_slm(payload, HF_API_TOKEN)
+    if isinstance(api_result, list) and api_result and "generated_text" in api_result[0]:
+        return api_result[0]["generated_text"]
+    if isinstance(api_result, dict) and "generated_text" in api_result:
+        return api_result["generated_text"]
+    return None
+
+def _log_bot_message(user_id, message):
+    # The account may have been deleted while the reply was being generated; nothing is
+    # logged for it then.
+    if not user_exists(user_id):
+        return None
+    return log_chat_message(user_id, "bot", message)
+
+@timed
+def run_chat_job(job, user_id, question, payload):
+    # Runs on a chat worker thread (see chat_jobs.py), so no Streamlit calls in here.
+    try:
+        cache_key = None
+        if is_cacheable(payload["parameters"]):
+            cache_key = make_cache_key(user_id, question, generate_user_Ritu_context(user_id),
+                                       get_chat_backend(HF_API_TOKEN).model_id, payload["parameters"])
+        bot_response = get_cached_response(cache_key) if cache_key else None
+        if bot_response is not None:
+            print(f"Chat response cache hit (hit rate {response_cache_stats()['hit_rate']:.0%})")
+        else:
+            generated_text = _generate_bot_response(job, payload)
+            if generated_text is None:
+                bot_response = "Oh dear, I'm having a little trouble gathering my thoughts right now."
+            else:
+                bot_response = clean_bot_response(generated_text)
+                if cache_key and generated_text.strip():
+                    store_response(cache_key, bot_response, user_id)
+    except (CircuitOpenError, ChatBackendUnavailable, requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+        # Endpoint down, slow or unreachable, or the local model missing or busy: answer with
+        # the friendly fallback right away.
+        print(f"Chat inference unavailable: {e}")
+        _log_bot_message(user_id, "API Connection Error (User was shown a generic message)")
+        raise ChatJobError(f"Chat inference unavailable: {e}", CONNECTION_FALLBACK_REPLY)
+    except requests.exceptions.HTTPError as e:
+        print(f"API Error: {e.response.status_code}.")
+        # Log the error attempt for the bot, but don't show API error to user directly in chat
+        _log_bot_message(user_id, "API Connection Error (User was shown a generic message)")
+        raise ChatJobError(f"API Error: {e.response.status_code}.", CONNECTION_FALLBACK_REPLY)
+    except Exception as e:
+        print(f"An unexpected hiccup occurred: {e}")
+        _log_bot_message(user_id, f"Unexpected Error: {e} (User was shown a generic message)")
+        raise ChatJobError(f"Unexpected Error: {e}", UNEXPECTED_FALLBACK_REPLY)
+    job.message_id = _log_bot_message(user_id, bot_response)
+    return bot_response
+
+@st.fragment(run_every=CHAT_POLL_SECONDS)
+def _show_pending_reply():
+    # Polls the running chat job; only this fragment reruns until the reply is ready.
+    job_id = st.session_state.get('pending_chat_job_id')
+    if not job_id:
+        return
+    job = get_chat_job(job_id)
+    if job is None or job.finished:
+        reply = job.result if job is not None and job.result else UNEXPECTED_FALLBACK_REPLY
+        message_id = getattr(job, "message_id", None) if job is not None and job.status == "done" else None
+        if job is not None and job.error:
+            st.session_state.chat_error = job.error  # shown above the input until the next message
+        st.session_state.chat_messages_display.append({"id": message_id, "sender": "bot", "message": reply})
+        st.session_state.pending_chat_job_id = None
+        st.session_state.chat_turn = st.session_state.get('chat_turn', 0) + 1
+        st.rerun()
+    elif job.partial:
+        st.markdown(render_message_html("bot", job.partial + "▌"), unsafe_allow_html=True)
+    else:
+        st.markdown(render_message_html("bot", "<i>MyRitu is thinking with care...</i>"), unsafe_allow_html=True)
+
+@timed
 def show_chat_tab():
     st.markdown(f"<h2 style='color: {PINK_TEXT_COLOR};'>💬 MyRitu Chat 💬</h2>", unsafe_allow_html=True)
     st.write("Talk about your Ritu, concerns, and health. I'm here to listen and provide general information.")
@@ -108,109 +264,59 @@ def show_chat_tab():
 
     user_id = st.session_state.user_id
 
-    if not HF_API_TOKEN:
+    if not chat_backend_available(HF_API_TOKEN):
         st.warning("MyRitu's AI features are currently unavailable.")
         return
 
     # Load chat history from DB for the session if not already loaded for display
     if 'chat_loaded_from_db' not in st.session_state or not st.session_state.chat_loaded_from_db:
         st.session_state.chat_messages_display = get_chat_history_from_db(user_id)
+        st.session_state.chat_has_older = len(st.session_state.chat_messages_display) >= CHAT_HISTORY_PAGE_SIZE
         st.session_state.chat_loaded_from_db = True # Mark as loaded for this session
 
+    if st.session_state.get('chat_has_older'):
+        if st.button("⬆️ Load older messages", key="Ritu_chat_load_older_btn"):
+            oldest_id = next(filter(None, (chat_log_id(msg.get("id")) for msg in st.session_state.chat_messages_display)), None)
+            older = get_chat_history_from_db(user_id, before_id=oldest_id) if oldest_id else []
+            st.session_state.chat_messages_display = older + st.session_state.chat_messages_display
+            st.session_state.chat_has_older = len(older) >= CHAT_HISTORY_PAGE_SIZE
+            st.rerun()
+
     chat_container = st.container()
     with chat_container:
-        for msg in st.session_state.chat_messages_display:
-            sender, message_content = msg["sender"], msg["message"]
-            if sender == "user":
-                st.markdown(f"<div style='display: flex; justify-content: flex-end; margin-bottom: 10px;'><div style='background-color: #F8BBD0; color: #383838; padding: 10px 15px; border-radius: 15px 15px 0 15px; max-width: 70%; font-size: 1em; line-height: 1.5;'><b>You:</b><br>{message_content}</div></div>", unsafe_allow_html=True)
-            else:
-                st.markdown(f"<div style='display: flex; justify-content: flex-start; margin-bottom: 10px;'><div style='background-color: #E3F2FD; color: #383838; padding: 10px 15px; border-radius: 15px 15px 15px 0; max-width: 70%; font-size: 1em; line-height: 1.5;'><b>MyRitu Bot:</b><br>{message_content}</div></div>", unsafe_allow_html=True)
+        # One markdown element for the whole conversation, assembled from cached bubbles.
+        st.markdown("".join(message_html(user_id, msg) for msg in st.session_state.chat_messages_display), unsafe_allow_html=True)
+        if st.session_state.get('pending_chat_job_id'):
+            _show_pending_reply()
     
+    if st.session_state.get('chat_error'):
+        st.error(st.session_state.chat_error)
     st.markdown("---")
     user_input = st.text_input("Ask something about your Ritu or health:", key="Ritu_chat_input_main_v5", placeholder="Type your message here...")
 
-    if st.button("Send", key="Ritu_chat_send_btn_main_v5") and user_input:
-        # Add to UI display list and log to DB
-        st.session_state.chat_messages_display.append({"sender": "user", "message": user_input})
-        log_chat_message(user_id, "user", user_input)
+    waiting_for_reply = bool(st.session_state.get('pending_chat_job_id'))
+    if st.button("Send", key="Ritu_chat_send_btn_main_v5", disabled=waiting_for_reply) and user_input:
+        # The request key is derived from this session, the conversation turn and the text, so
+        # a double submit or rerun of the same message maps to the same job (chat_jobs'
+        # UNIQUE request_key); the turn advances once a reply is shown, so asking again later
+        # is a new request.
+        if 'chat_session_key' not in st.session_state:
+            st.session_state.chat_session_key = uuid.uuid4().hex
+        request_key = make_request_key(st.session_state.chat_session_key, user_id,
+                                       st.session_state.get('chat_turn', 0), user_input)
+        if request_key != st.session_state.get('chat_request_key'):
+            st.session_state.chat_request_key = request_key
+            st.session_state.chat_error = None
+            # Add to UI display list and log to DB
+            message_id = log_chat_message(user_id, "user", user_input)
+            st.session_state.chat_messages_display.append({"id": message_id, "sender": "user", "message": user_input})
+            try:
+                st.session_state.pending_chat_job_id = submit_chat_job(
+                    user_id, request_key, run_chat_job, user_id, user_input, build_chat_payload(user_id, user_input))
+            except ChatQueueFullError as e:
+                print(f"Chat job rejected: {e}")
+                busy_reply = "I'm helping a lot of people right now. Could you ask me again in a moment, dear?"
+                st.session_state.chat_messages_display.append({"sender": "bot", "message": busy_reply})
+                st.session_state.chat_turn = st.session_state.get('chat_turn', 0) + 1
+                log_chat_message(user_id, "bot", busy_reply)
         st.rerun() # Rerun to show user message immediately
-
-    # Process last user message for bot response
-    if st.session_state.chat_messages_display and st.session_state.chat_messages_display[-1]["sender"] == "user":
-        # Check if this user message already has a subsequent bot response in the display list
-        # This is a simple check; more robust would be to track message IDs or a "waiting_for_bot" flag
-        needs_bot_response = True
-        if len(st.session_state.chat_messages_display) > 1:
-            if st.session_state.chat_messages_display[-2]["sender"] == "user" and \
-               st.session_state.chat_messages_display[-1]["sender"] == "user": # Two user messages in a row (unlikely with rerun)
-                 pass # Only respond to the latest one
-            elif st.session_state.chat_messages_display[-2]["sender"] == "bot": # Last interaction was bot responding
-                 needs_bot_response = False # Bot already responded to previous user message
-
-        # More direct: if the last message is user, and it's the *only* message or the one before it was bot, then respond.
-        if len(st.session_state.chat_messages_display) == 0: # Should not happen if user message was just added
-            needs_bot_response = False
-        elif st.session_state.chat_messages_display[-1]["sender"] == "user":
-            if len(st.session_state.chat_messages_display) == 1: # First user message
-                needs_bot_response = True
-            elif st.session_state.chat_messages_display[-2]["sender"] == "bot": # User replied to bot
-                needs_bot_response = True
-            else: # This implies user sent multiple messages before bot could reply, respond to latest
-                needs_bot_response = True # Or false if you only want to respond once per button click cycle
-
-        # Simplified logic: if the last message is 'user', assume we need a bot response
-        # This might lead to multiple bot responses if user types fast and reruns happen.
-        # A flag `st.session_state.waiting_for_bot_response = True` set on Send button click,
-        # and cleared after bot responds, would be more robust.
-
-        # For now, let's use a simpler check: if the very last message is 'user', try to get a bot response.
-        # This means the previous logic for `needs_bot_response` is complex.
-        # Let's assume if the last message is 'user', we process it.
-        # To prevent re-processing, we can add a temporary flag or check message count.
-
-        # Let's refine: only process if the last message is 'user' AND we haven't just processed it.
-        # A simple way is to check if the total number of messages is odd (user sent last).
-        if len(st.session_state.chat_messages_display) % 2 != 0: # Odd number means user sent last
-            user_context_summary = generate_user_Ritu_context(user_id)
-            last_user_message = st.session_state.chat_messages_display[-1]["message"]
-
-            system_prompt = f"""<|system|>
-You are MyRitu Chat... (rest of your detailed system prompt from previous version) ...
-
-User's Context:
-{user_context_summary}</s>
-<|user|>
-My question is: "{last_user_message}"</s>
-<|assistant|>
-"""
-            payload = {"inputs": system_prompt, "parameters": {"max_new_tokens": 450, "return_full_text": False, "temperature": 0.7, "top_p": 0.9, "do_sample": True, "repetition_penalty": 1.1}}
-
-            with st.spinner("MyRitu is thinking with care..."):
-                try:
-                    api_result = query_hf_slm(payload, HF_API_TOKEN)
-                    bot_response = "Oh dear, I'm having a little trouble gathering my thoughts right now."
-                    # ... (API result parsing as before) ...
-                    if isinstance(api_result, list) and api_result and "generated_text" in api_result[0]:
-                        bot_response = api_result[0]["generated_text"].strip()
-                    elif isinstance(api_result, dict) and "generated_text" in api_result:
-                         bot_response = api_result["generated_text"].strip()
-                    if "<|assistant|>" in bot_response: bot_response = bot_response.split("<|assistant|>")[-1].strip()
-                    if not bot_response: bot_response = "I seem to be at a loss for words. Could you try rephrasing, dear?"
-
-                    # Add to UI display list and log to DB
-                    st.session_state.chat_messages_display.append({"sender": "bot", "message": bot_response})
-                    log_chat_message(user_id, "bot", bot_response)
-                    st.rerun()
-                except requests.exceptions.HTTPError as e:
-                    # ... (error handling as before) ...
-                    error_message = f"API Error: {e.response.status_code}."
-                    st.error(error_message)
-                    # Log the error attempt for the bot, but don't show API error to user directly in chat
-                    st.session_state.chat_messages_display.append({"sender": "bot", "message": "Oh dear, my connection seems a bit weak. Could you try asking again in a moment?"})
-                    log_chat_message(user_id, "bot", "API Connection Error (User was shown a generic message)") # Log internal error
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"An unexpected hiccup occurred: {e}")
-                    st.session_state.chat_messages_display.append({"sender": "bot", "message": "Goodness, something unexpected happened on my end!"})
-                    log_chat_message(user_id, "bot", f"Unexpected Error: {e} (User was shown a generic message)")
-                    st.rerun()
\ No newline at end of file
@@ -1,10 +1,14 @@
 import streamlit as st
 from datetime import datetime # Keep only one import
 # from datetime import timedelta # Not directly used here
-from utils import calculate_next_period, get_Ritu_phase, format_date, get_hormone_info
+from utils import format_date, get_hormone_info
+from db import get_Ritu_stats
+from precompute import get_home_prediction
+from instrumentation import timed
 
 PINK_TEXT_COLOR = "#E57396" # Define it here or import from main if centralized
 
+@timed
 def show_home_tab():
     st.markdown(f"<h1 style='color: {PINK_TEXT_COLOR};'>🌸 Welcome to MyRitu! 🌸</h1>", unsafe_allow_html=True)
     
@@ -28,7 +32,10 @@ def show_home_tab():
         return
 
     today = datetime.now().date()
-    next_pred, ovulation_pred, fertile_window_pred = calculate_next_period(last_period_start, avg_Ritu_length)
+    # Precomputed nightly by precompute.py; recomputed here only if the stored row is stale.
+    # Estimated from logged Ritu lengths once there are enough of them, else the profile average.
+    prediction = get_home_prediction(st.session_state.user_id, profile, get_Ritu_stats(st.session_state.user_id), today)
+    next_pred = prediction['next_period_start']
 
     st.subheader("Your Ritu At a Glance")
     # ... (rest of the home tab logic as before) ...
@@ -42,14 +49,19 @@ def show_home_tab():
                  st.metric(label="Predicted Next Period In", value=f"{days_to_next_period} days", delta=f"on {format_date(next_pred)}")
             else:
                  st.metric(label="Next Period Was Predicted For", value=format_date(next_pred), help="You might be late, or your Ritu length varied. Please log your new period.")
+            if prediction['interval_start']:
+                st.caption(f"Likely between {format_date(prediction['interval_start'])} and {format_date(prediction['interval_end'])} "
+                           f"(based on {prediction['Ritus_used']} logged Ritus, recent ones weighted most).")
         else:
             st.write("Next period prediction unavailable.")
     with col2:
         st.metric(label="Average Ritu Length", value=f"{avg_Ritu_length} days")
+        if prediction['source'] == "history":
+            st.metric(label="Estimated From Your Logs", value=f"{prediction['Ritu_length']:.1f} days")
         st.metric(label="Average Period Length", value=f"{avg_period_length} days")
 
     st.markdown("---")
-    current_phase = get_Ritu_phase(today, last_period_start, avg_period_length, avg_Ritu_length)
+    current_phase = prediction['phase']
     st.subheader(f"Today's Phase: {current_phase}")
     hormone_details = get_hormone_info(current_phase)
     st.write(hormone_details['Description'])
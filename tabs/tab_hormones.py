@@ -1,6 +1,8 @@
 import streamlit as st
 from utils import get_hormone_info
+from instrumentation import timed
 
+@timed
 def show_hormones_tab():
     st.title("🧬 Hormone Hub")
     st.write("Understanding the key hormones involved in your menstrual Ritu.")
@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-import pandas as pd
+from functools import lru_cache
 import numpy as np
 
 def calculate_next_period(last_period_start_str, avg_Ritu_length):
@@ -17,56 +17,89 @@ def calculate_next_period(last_period_start_str, avg_Ritu_length):
     except (ValueError, TypeError):
         return None, None, None
 
+def iter_predicted_Ritus(last_period_start, avg_Ritu_length, from_date=None):
+    # Lazily yields (period_start, ovulation_day, (fertile_start, fertile_end)) as dates for
+    # each upcoming Ritu, with the same arithmetic as calculate_next_period. With from_date,
+    # starts at the Ritu containing that date instead of walking forward from the last period.
+    if not last_period_start or not avg_Ritu_length:
+        return
+    if isinstance(last_period_start, str):
+        last_period_start = _parse_date(last_period_start)
+    step = timedelta(days=avg_Ritu_length)
+    k = 1
+    if from_date is not None:
+        k = max(1, (from_date - last_period_start).days // avg_Ritu_length)
+    period_start = last_period_start + k * step
+    while True:
+        ovulation_day = period_start - timedelta(days=14)
+        yield period_start, ovulation_day, (ovulation_day - timedelta(days=5), ovulation_day + timedelta(days=1))
+        period_start += step
+
+# Phase codes returned by get_Ritu_phase_codes; PHASE_NAMES[code] is the label get_Ritu_phase returns.
+PHASE_UNKNOWN, PHASE_MENSTRUATION, PHASE_FOLLICULAR, PHASE_OVULATION, PHASE_LUTEAL, PHASE_TRANSITION = range(6)
+PHASE_NAMES = ("Unknown", "Menstruation", "Follicular Phase", "Ovulation / Fertile Window",
+               "Luteal Phase", "Ritu Transition / Unknown")
+
+@lru_cache(maxsize=1024)
+def _parse_date(date_str):
+    return datetime.strptime(date_str, '%Y-%m-%d').date()
+
+def _phase_code_for_day(day_in_Ritu, avg_period_length, avg_Ritu_length):
+    if 1 <= day_in_Ritu <= avg_period_length:
+        return PHASE_MENSTRUATION
+    ovulation_day_in_Ritu = avg_Ritu_length - 14
+    if avg_period_length < day_in_Ritu < ovulation_day_in_Ritu - 2:
+        return PHASE_FOLLICULAR
+    if ovulation_day_in_Ritu - 2 <= day_in_Ritu <= ovulation_day_in_Ritu + 2:
+        return PHASE_OVULATION
+    if ovulation_day_in_Ritu + 2 < day_in_Ritu <= avg_Ritu_length:
+        return PHASE_LUTEAL
+    return PHASE_TRANSITION
+
 def get_Ritu_phase(current_date, last_period_start_str, avg_period_length, avg_Ritu_length):
     if not last_period_start_str or not avg_period_length or not avg_Ritu_length:
         return "Unknown"
     try:
-        last_start = datetime.strptime(last_period_start_str, '%Y-%m-%d').date()
-        current_date_obj = current_date
-
-        Ritu_starts = [last_start]
-        temp_start = last_start
-        while temp_start + timedelta(days=avg_Ritu_length) <= current_date_obj + timedelta(days=avg_Ritu_length):
-            temp_start += timedelta(days=avg_Ritu_length)
-            Ritu_starts.append(temp_start)
-        
-        temp_start = last_start
-        while temp_start - timedelta(days=avg_Ritu_length) >= current_date_obj - timedelta(days=avg_Ritu_length*2):
-             temp_start -= timedelta(days=avg_Ritu_length)
-             Ritu_starts.insert(0,temp_start)
-
-        current_Ritu_start_date = None
-        for i in range(len(Ritu_starts)):
-            cs_date = Ritu_starts[i]
-            next_cs_date = Ritu_starts[i+1] if i+1 < len(Ritu_starts) else cs_date + timedelta(days=avg_Ritu_length)
-            if cs_date <= current_date_obj < next_cs_date:
-                current_Ritu_start_date = cs_date
-                break
-        
-        if not current_Ritu_start_date:
-             current_Ritu_start_date = last_start
-
-        day_in_Ritu = (current_date_obj - current_Ritu_start_date).days + 1
-
-        if 1 <= day_in_Ritu <= avg_period_length:
-            return "Menstruation"
-        
-        ovulation_day_in_Ritu = avg_Ritu_length - 14
-        
-        if avg_period_length < day_in_Ritu < ovulation_day_in_Ritu - 2:
-            return "Follicular Phase"
-        
-        if ovulation_day_in_Ritu - 2 <= day_in_Ritu <= ovulation_day_in_Ritu + 2:
-            return "Ovulation / Fertile Window"
-            
-        if ovulation_day_in_Ritu + 2 < day_in_Ritu <= avg_Ritu_length:
-            return "Luteal Phase"
-            
-        return "Ritu Transition / Unknown"
+        if avg_Ritu_length <= 0:
+            return "Unknown"
+        last_start = _parse_date(last_period_start_str)
+        # Cycles repeat every avg_Ritu_length days from last_start in both directions,
+        # so the day within the current cycle is a floor-modulo of the day offset.
+        day_in_Ritu = (current_date - last_start).days % avg_Ritu_length + 1
+        return PHASE_NAMES[_phase_code_for_day(day_in_Ritu, avg_period_length, avg_Ritu_length)]
     except (ValueError, TypeError) as e:
         print(f"Error in get_Ritu_phase: {e}")
         return "Unknown"
 
+def get_Ritu_phase_codes(dates, last_period_start_str, avg_period_length, avg_Ritu_length):
+    # Batch form of get_Ritu_phase: takes any array-like of dates (datetime64, date objects or
+    # 'YYYY-MM-DD' strings) and returns an int8 array of phase codes in one vectorized pass.
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    if not last_period_start_str or not avg_period_length or not avg_Ritu_length or avg_Ritu_length <= 0:
+        return np.full(dates.shape, PHASE_UNKNOWN, dtype=np.int8)
+    try:
+        last_start = np.datetime64(_parse_date(last_period_start_str), 'D')
+    except (ValueError, TypeError) as e:
+        print(f"Error in get_Ritu_phase_codes: {e}")
+        return np.full(dates.shape, PHASE_UNKNOWN, dtype=np.int8)
+
+    day_in_Ritu = (dates - last_start).astype(np.int64) % avg_Ritu_length + 1
+    ovulation_day_in_Ritu = avg_Ritu_length - 14
+    # np.select keeps the first matching condition, mirroring the order in _phase_code_for_day.
+    codes = np.select(
+        [(1 <= day_in_Ritu) & (day_in_Ritu <= avg_period_length),
+         (avg_period_length < day_in_Ritu) & (day_in_Ritu < ovulation_day_in_Ritu - 2),
+         (ovulation_day_in_Ritu - 2 <= day_in_Ritu) & (day_in_Ritu <= ovulation_day_in_Ritu + 2),
+         (ovulation_day_in_Ritu + 2 < day_in_Ritu) & (day_in_Ritu <= avg_Ritu_length)],
+        [PHASE_MENSTRUATION, PHASE_FOLLICULAR, PHASE_OVULATION, PHASE_LUTEAL],
+        default=PHASE_TRANSITION,
+    )
+    return codes.astype(np.int8)
+
+def get_Ritu_phase_names(dates, last_period_start_str, avg_period_length, avg_Ritu_length):
+    return np.asarray(PHASE_NAMES, dtype=object)[
+        get_Ritu_phase_codes(dates, last_period_start_str, avg_period_length, avg_Ritu_length)]
+
 def get_hormone_info(phase):
     base_info = {
         "Menstruation": {
@@ -97,21 +130,21 @@ def get_hormone_info(phase):
     return base_info.get(phase, base_info["Unknown"])
 
 
-def get_typical_hormone_levels(day_in_Ritu, Ritu_length=28):
-    x = day_in_Ritu / Ritu_length
+HORMONE_NAMES = ("Estrogen", "Progesterone", "LH", "FSH")
 
+def _hormone_curves(x):
+    # x is the position within the cycle (day / Ritu_length) as an array; the scalar
+    # branches of the original model become np.where masks over the whole day axis.
     estrogen = (np.sin(x * 2 * np.pi - np.pi/2) * 0.4 + 0.5) + \
                (np.exp(-( (x - 0.45)**2 / (2 * 0.01**2))) * 0.5)
     estrogen = np.clip(estrogen * (1 - (np.exp(-( (x - 0.1)**2 / (2 * 0.05**2))) * 0.3) ), 0.1, 1)
-    if 0.6 < x < 0.85:
-        estrogen += (np.sin((x - 0.6) / (0.85 - 0.6) * np.pi) * 0.2)
+    estrogen = np.where((0.6 < x) & (x < 0.85), estrogen + np.sin((x - 0.6) / (0.85 - 0.6) * np.pi) * 0.2, estrogen)
 
-    progesterone = np.zeros_like(estrogen)
     ovulation_point = 0.5
-    if x > ovulation_point:
-        progesterone = np.sin((x - ovulation_point) / (1 - ovulation_point) * np.pi) * 0.9 + 0.1
+    progesterone = np.where(x > ovulation_point,
+                            np.sin((x - ovulation_point) / (1 - ovulation_point) * np.pi) * 0.9 + 0.1, 0.0)
     progesterone = np.clip(progesterone, 0.05, 1)
-    if x < ovulation_point + 0.05 : progesterone = 0.05
+    progesterone = np.where(x < ovulation_point + 0.05, 0.05, progesterone)
 
     lh = (np.exp(-( (x - 0.5)**2 / (2 * 0.015**2))) * 0.9) + 0.1
     lh = np.clip(lh, 0.1, 1)
@@ -127,20 +160,29 @@ def get_typical_hormone_levels(day_in_Ritu, Ritu_length=28):
         "FSH": np.clip(fsh,0.05,1)
     }
 
-def generate_hormone_graph_data(Ritu_length=28):
-    days = np.arange(1, Ritu_length + 1)
-    hormone_data = {
-        "Day": [],
-        "Hormone": [],
-        "Level (Relative)": []
-    }
-    for day in days:
-        levels = get_typical_hormone_levels(day, Ritu_length=Ritu_length)
-        for hormone_name, level_val in levels.items():
-            hormone_data["Day"].append(day)
-            hormone_data["Hormone"].append(hormone_name)
-            hormone_data["Level (Relative)"].append(level_val)
-    return pd.DataFrame(hormone_data)
+def get_typical_hormone_levels(day_in_Ritu, Ritu_length=28):
+    # Accepts a single day or an array of days; a single day gives scalar levels.
+    x = np.asarray(day_in_Ritu, dtype=float) / Ritu_length
+    return {name: level[()] for name, level in _hormone_curves(x).items()}
+
+@lru_cache(maxsize=64)
+def _hormone_graph_frame(Ritu_length, points_per_day):
+    if points_per_day == 1:
+        days = np.arange(1, Ritu_length + 1)
+    else:
+        days = np.linspace(1, Ritu_length, (Ritu_length - 1) * points_per_day + 1)
+    levels = _hormone_curves(days / Ritu_length)
+    import pandas as pd  # deferred so importing utils (e.g. for get_Ritu_phase) stays light
+    # Long format, one row per (day, hormone), in the same row order as the old per-day loop.
+    return pd.DataFrame({
+        "Day": np.repeat(days, len(HORMONE_NAMES)),
+        "Hormone": np.tile(np.asarray(HORMONE_NAMES, dtype=object), len(days)),
+        "Level (Relative)": np.column_stack([levels[name] for name in HORMONE_NAMES]).ravel(),
+    })
+
+def generate_hormone_graph_data(Ritu_length=28, points_per_day=1):
+    # Memoized per (Ritu_length, points_per_day); points_per_day > 1 gives smoother sub-day curves.
+    return _hormone_graph_frame(int(Ritu_length), max(1, int(points_per_day))).copy()
 
 def format_date(date_str, output_format="%B %d, %Y"):
     if not date_str: return "N/A"